@@ -1,9 +1,17 @@
 # push_my_news.py
 # deps: pip install requests feedparser beautifulsoup4 python-dateutil
 
-import os, time, json, hashlib, requests
+import os, time, json, hashlib, queue, requests
 import re
+from array import array
+from bisect import bisect_left
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain, islice
 import hmac, base64, hashlib as _hashlib
+import mmap, struct, sys, threading, zlib
 import feedparser
 from bs4 import BeautifulSoup
 from dateutil import parser as dateparser
@@ -26,6 +34,7 @@ except ImportError:
 
 # Google Gemini API Configuration (no default hardcoded key)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash").strip() or "gemini-2.5-flash"
 
 # Import Gemini
 try:
@@ -161,42 +170,180 @@ def is_recent_news(published_at_str, hours=24):
         print(f"  Date parsing error: {e}, considering recent")
         return True  # If parsing fails, consider it recent
 
-# In-memory dedup for current run only (time-based filtering handles cross-run)
-SEEN = set()
-SENT_URLS = set()  # Track URLs that have been sent to prevent repeats
+def _hash64(s: str) -> int:
+    """Fixed-width 64-bit fingerprint of a string (used for compact dedup keys)."""
+    return int.from_bytes(hashlib.blake2b((s or "").encode("utf-8", "ignore"), digest_size=8).digest(), "big")
+
+
+class RotatingSeenCache:
+    """Bounded set of 64-bit keys with time-based eviction.
+
+    Two generations of sets are kept: new keys go into the current one, and
+    lookups check both. The current generation is rotated into the previous
+    one (dropping the old previous) every ttl/2 seconds, or earlier if it
+    reaches half the capacity. A key therefore lives between ttl/2 and ttl,
+    memory never exceeds max_items keys, and add/lookup stay O(1).
+    """
+
+    def __init__(self, ttl_sec: float, max_items: int):
+        self.ttl_sec = max(1.0, float(ttl_sec))
+        self.max_items = max(2, int(max_items))
+        self._cur = set()
+        self._prev = set()
+        self._rotated_at = time.time()
+
+    def _maybe_rotate(self):
+        now = time.time()
+        if now - self._rotated_at >= self.ttl_sec / 2 or len(self._cur) >= self.max_items // 2:
+            self._prev = self._cur
+            self._cur = set()
+            self._rotated_at = now
+
+    def __contains__(self, key) -> bool:
+        if not key:
+            return False
+        self._maybe_rotate()
+        h = _hash64(key)
+        return h in self._cur or h in self._prev
+
+    def add(self, key):
+        if not key:
+            return
+        self._maybe_rotate()
+        self._cur.add(_hash64(key))
+
+    def __len__(self) -> int:
+        return len(self._cur) + len(self._prev)
+
+
+# In-process dedup (time-based filtering and sent_news.txt handle cross-run).
+# Both caches are bounded so the long-running worker's memory stays flat.
+try:
+    SEEN_CACHE_TTL_HOURS = float(os.environ.get("SEEN_CACHE_TTL_HOURS", "24"))
+except Exception:
+    SEEN_CACHE_TTL_HOURS = 24.0
+try:
+    SEEN_CACHE_MAX_ITEMS = int(os.environ.get("SEEN_CACHE_MAX_ITEMS", "20000"))
+except Exception:
+    SEEN_CACHE_MAX_ITEMS = 20000
+
+SEEN = RotatingSeenCache(SEEN_CACHE_TTL_HOURS * 3600, SEEN_CACHE_MAX_ITEMS)
+SENT_URLS = RotatingSeenCache(SEEN_CACHE_TTL_HOURS * 3600, SEEN_CACHE_MAX_ITEMS)  # Track URLs that have been sent to prevent repeats
 
 # Persistent deduplication file (can be overridden to a mounted volume path)
 SENT_NEWS_FILE = os.environ.get("SENT_NEWS_PATH", "logs/sent_news.txt").strip() or "logs/sent_news.txt"
 
+# Number of most recent sent URLs kept as exact strings; older ones are kept
+# only as sorted 64-bit hashes (8 bytes each) so memory stays small.
+try:
+    SENT_NEWS_EXACT_TAIL = int(os.environ.get("SENT_NEWS_EXACT_TAIL", "2000"))
+except Exception:
+    SENT_NEWS_EXACT_TAIL = 2000
+
+
+class SentUrlIndex:
+    """Compact membership index for every URL ever pushed.
+
+    The most recent URLs live in an insertion-ordered dict (exact match).
+    Older URLs are folded into a sorted array('Q') of 64-bit hashes and
+    looked up with binary search. URLs added during this run are buffered
+    until flush() hands them to save_sent_news(). tail_size=0 keeps new URLs
+    exact until the end-of-cycle flush() instead of refolding on every add().
+    """
+
+    def __init__(self, tail_size=SENT_NEWS_EXACT_TAIL):
+        self.tail_size = max(0, int(tail_size))
+        self._hashes = array('Q')
+        self._tail = {}
+        self._pending = []
+
+    def __contains__(self, url) -> bool:
+        if not url:
+            return False
+        if url in self._tail:
+            return True
+        h = _hash64(url)
+        i = bisect_left(self._hashes, h)
+        return i < len(self._hashes) and self._hashes[i] == h
+
+    def __len__(self) -> int:
+        return len(self._hashes) + len(self._tail)
+
+    def _fold(self, keep: int):
+        """Move all but the newest `keep` exact URLs into the hash array."""
+        overflow = len(self._tail) - keep
+        if overflow <= 0:
+            return
+        oldest = list(islice(self._tail, overflow))
+        for u in oldest:
+            del self._tail[u]
+        self._hashes = array('Q', sorted(set(chain(self._hashes, map(_hash64, oldest)))))
+
+    def load(self, urls):
+        """Add URLs read from disk (not re-persisted); the newest tail_size stay exact."""
+        folded = []
+        for url in urls:
+            if not url:
+                continue
+            self._tail[url] = None
+            if len(self._tail) > self.tail_size:
+                oldest = next(iter(self._tail))
+                del self._tail[oldest]
+                folded.append(_hash64(oldest))
+        self._hashes = array('Q', sorted(set(chain(self._hashes, folded))))
+
+    def add(self, url):
+        if not url or url in self:
+            return
+        self._tail[url] = None
+        self._pending.append(url)
+        # Fold the overflow in batches so the array is rebuilt rarely.
+        if self.tail_size and len(self._tail) > 2 * self.tail_size:
+            self._fold(self.tail_size)
+
+    def flush(self, write) -> int:
+        """Pass URLs added since the last flush to write(urls) and return how many;
+        if write raises they stay queued for the next flush. Also folds the exact
+        tail back down to tail_size."""
+        self._fold(self.tail_size)
+        if not self._pending:
+            return 0
+        write(self._pending)
+        flushed, self._pending = len(self._pending), []
+        return flushed
+
+
 def load_sent_news():
-    """Load previously sent news URLs from file"""
-    sent_urls = set()
+    """Load previously sent news URLs from file into a compact SentUrlIndex"""
+    sent_urls = SentUrlIndex()
     try:
         if os.path.exists(SENT_NEWS_FILE):
             with open(SENT_NEWS_FILE, 'r', encoding='utf-8') as f:
-                for line in f:
-                    url = line.strip()
-                    if url:
-                        sent_urls.add(url)
+                sent_urls.load(line.strip() for line in f)
         print(f"Loaded {len(sent_urls)} previously sent news URLs")
     except Exception as e:
         print(f"Error loading sent news: {e}")
     return sent_urls
 
+def _append_sent_news(urls):
+    # Ensure parent directory exists when using volume paths like /data/sent_news.txt
+    try:
+        parent = os.path.dirname(SENT_NEWS_FILE)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+    except Exception:
+        pass
+    with open(SENT_NEWS_FILE, 'a', encoding='utf-8') as f:
+        for url in urls:
+            f.write(f"{url}\n")
+
 def save_sent_news(sent_urls):
-    """Save sent news URLs to file"""
+    """Append URLs sent since the last save to file (the file is append-only).
+    On failure they stay queued in sent_urls, so the next save retries."""
     try:
-        # Ensure parent directory exists when using volume paths like /data/sent_news.txt
-        try:
-            parent = os.path.dirname(SENT_NEWS_FILE)
-            if parent and not os.path.exists(parent):
-                os.makedirs(parent, exist_ok=True)
-        except Exception:
-            pass
-        with open(SENT_NEWS_FILE, 'w', encoding='utf-8') as f:
-            for url in sorted(sent_urls):
-                f.write(f"{url}\n")
-        print(f"Saved {len(sent_urls)} sent news URLs to file")
+        saved = sent_urls.flush(_append_sent_news)
+        if saved:
+            print(f"Saved {saved} new sent news URLs to file ({len(sent_urls)} total)")
     except Exception as e:
         print(f"Error saving sent news: {e}")
 
@@ -208,7 +355,7 @@ def get_tenant_access_token(app_id, app_secret):
     url = f"{BASE}/open-apis/auth/v3/tenant_access_token/internal"
     headers = {'Content-Type': 'application/json; charset=utf-8'}
     payload = {'app_id': app_id, 'app_secret': app_secret}
-    r = requests.post(url, headers=headers, data=json.dumps(payload), timeout=TIMEOUT)
+    r = requests.post(url, headers=headers, data=json.dumps(payload), timeout=_stage_timeout(TIMEOUT, floor=5.0))
     r.raise_for_status()
     data = r.json()
     if data.get("code") == 0:
@@ -235,7 +382,7 @@ def send_card_message(token, chat_id, title, content, attribution=None):
         "elements": elements
     }
     payload = { "receive_id": chat_id, "msg_type": "interactive", "content": json.dumps(card, ensure_ascii=False) }
-    r = requests.post(url, headers=headers, json=payload, timeout=TIMEOUT)
+    r = requests.post(url, headers=headers, json=payload, timeout=_stage_timeout(TIMEOUT, floor=5.0))
     r.raise_for_status()
     data = r.json()
     if data.get("code") != 0:
@@ -268,7 +415,7 @@ def send_card_message_with_image(token, chat_id, title, content, image_key, attr
         "elements": elements
     }
     payload = { "receive_id": chat_id, "msg_type": "interactive", "content": json.dumps(card, ensure_ascii=False) }
-    r = requests.post(url, headers=headers, json=payload, timeout=TIMEOUT)
+    r = requests.post(url, headers=headers, json=payload, timeout=_stage_timeout(TIMEOUT, floor=5.0))
     r.raise_for_status()
     data = r.json()
     if data.get("code") != 0:
@@ -342,7 +489,8 @@ def send_card_via_webhook(webhook_url, title, content, secret=None, attribution=
 		ts = str(int(time.time()))
 		sign = _gen_webhook_sign(secret, ts)
 		payload.update({ "timestamp": ts, "sign": sign })
-	r = requests.post(webhook_url, json=payload, timeout=TIMEOUT)
+	# Sending never aborts on the item deadline, but waits at most 5s once it is spent
+	r = requests.post(webhook_url, json=payload, timeout=_stage_timeout(TIMEOUT, floor=5.0))
 	print(f"  📡 Webhook response status: {r.status_code}")
 	try:
 		data = r.json()
@@ -478,18 +626,247 @@ def _jaccard(a, b) -> float:
     return inter / len(a | b)
 
 
+# Minimum number of shared entity/number tokens for a fingerprint match.
+try:
+    ENTITY_FP_MIN_SHARED = int(os.environ.get("ENTITY_FP_MIN_SHARED", "3"))
+except Exception:
+    ENTITY_FP_MIN_SHARED = 3
+
+# Fraction of the larger fingerprint that the shared tokens must cover.
+try:
+    ENTITY_FP_MIN_RATIO = float(os.environ.get("ENTITY_FP_MIN_RATIO", "0.6"))
+except Exception:
+    ENTITY_FP_MIN_RATIO = 0.6
+
+_FP_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9.,+]*")
+# Figures that identify a story: currency amounts, percentages, amounts with a
+# magnitude word or thousands separators, and 4+ digit numbers (years, prices).
+# Model numbers ("S25", "15", "One UI 8") are deliberately not figures.
+_FP_FIGURE_RE = re.compile(
+    r"(?<![A-Za-z0-9.,])(?:(?:RM|MYR|USD|SGD|US\$|\$|£|€)\s?\d[\d,]*(?:\.\d+)?"
+    r"|\d[\d,]*(?:\.\d+)?\s?(?:%|percent\b|billion\b|million\b|bil\b|juta\b|bilion\b)"
+    r"|\d{1,3}(?:,\d{3})+(?:\.\d+)?(?![\d])|\d{4,}(?![A-Za-z0-9]))",
+    re.IGNORECASE,
+)
+# Capitalized words that carry no identity in English/Malay headlines.
+_FP_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "to", "for", "with", "from", "by",
+    "is", "are", "be", "as", "its", "it", "this", "that", "new", "now", "after", "over", "up",
+    "how", "why", "what", "who", "here", "says", "said", "will", "can", "more", "first",
+    "dan", "di", "ke", "yang", "untuk", "dari", "pada", "dengan", "ini", "itu", "baru",
+}
+
+
+# Bumped when _entity_fingerprint changes, so stored fingerprints are recomputed.
+_FP_VERSION = 2
+
+
+def _entity_fingerprint(title: str):
+    """Language-independent story fingerprint: (names, figures).
+
+    Names are capitalized Latin words (brands, people, places) and model
+    tokens mixing letters and digits ("S25"); figures are prices, amounts,
+    percentages and years (see _FP_FIGURE_RE), so two stories about the same
+    product only share figures when they report the same facts. Both survive
+    the LLM title rewrite because the prompt keeps names and figures as-is.
+    """
+    ents, nums = set(), set()
+    for m in _FP_FIGURE_RE.finditer(title or ""):
+        nums.add(re.sub(r"[\s,]", "", m.group(0)).lower().replace("percent", "%"))
+    for tok in _FP_TOKEN_RE.findall(title or ""):
+        tok = tok.rstrip(".,+")
+        norm = tok.replace(",", "").lower()
+        if not norm or norm in nums or norm.replace(".", "").isdigit():
+            continue
+        if any(ch.isdigit() for ch in norm):
+            if any(ch.isalpha() for ch in norm):
+                ents.add(norm)
+        elif tok[0].isupper() and len(norm) >= 2 and norm not in _FP_STOPWORDS:
+            ents.add(norm)
+    return frozenset(ents), frozenset(nums)
+
+
+def _with_story_sigs(rec):
+    """Attach the in-memory similarity fields to a sent-story record."""
+    rec["_sig"] = _story_signature(rec.get("title", ""))
+    rec["_orig_sig"] = _story_signature(rec.get("orig_title", ""))
+    rec.setdefault("orig_title_key", _norm_title_key(rec.get("orig_title", "")))
+    if "entities" not in rec or rec.get("fp_version") != _FP_VERSION:
+        rec["fp_version"] = _FP_VERSION
+        ents, nums = _entity_fingerprint(f"{rec.get('orig_title', '')} {rec.get('title', '')}")
+        rec["entities"] = " ".join(sorted(ents))
+        rec["numbers"] = " ".join(sorted(nums))
+    rec["_fp"] = (frozenset(rec["entities"].split()), frozenset(rec["numbers"].split()))
+    return rec
+
+
+# Binary snapshot of the story dedup index, so cold starts (every ONE_SHOT run)
+# don't re-decode the whole JSONL and rebuild every bigram signature. The JSONL
+# stays the source of truth: the snapshot records how many bytes of it it
+# covers, lines appended after that are parsed normally, and any mismatch
+# (bad checksum, version bump, file rewritten) triggers a full rebuild.
+SENT_STORIES_INDEX_FILE = os.environ.get("SENT_STORIES_INDEX_PATH", "").strip() or (SENT_STORIES_FILE + ".idx")
+
+_STORY_IDX_MAGIC = b"ADSI"
+_STORY_IDX_VERSION = 4
+# magic, version, flags, record count, bigram count, covered JSONL bytes,
+# crc32 of the JSONL head, crc32 of the payload
+_STORY_IDX_HEADER = struct.Struct("<4sHHIIQII")
+_STORY_IDX_STR_FIELDS = ("url", "title", "title_key", "source", "orig_title", "orig_title_key", "entities", "numbers")
+_STORY_IDX_SIG_FIELDS = ("_sig", "_orig_sig")
+_STORY_IDX_HEAD_BYTES = 4096
+
+
+def _jsonl_head_crc(path: str, src_size: int) -> int:
+    """crc32 of the first min(src_size, 4096) bytes: the same range at save and load,
+    so appends to a file still under 4KB do not invalidate the index."""
+    with open(path, "rb") as f:
+        return zlib.crc32(f.read(min(src_size, _STORY_IDX_HEAD_BYTES)))
+
+
+def _save_story_index(records, src_size: int):
+    """Write records (dicts with ts/str fields/_sig) to SENT_STORIES_INDEX_FILE.
+
+    Layout after the header (all little-endian, fixed-width sections so the
+    file can be sliced straight out of an mmap):
+      ts[count] int64 | simhash[count] uint64 | str_offsets[count*F+1] uint32 | post_offsets[count*S+1] uint32 |
+      bigram_offsets[nbig+1] uint32 | postings[...] uint32 | string blob | bigram blob
+    """
+    try:
+        ts = array('q')
+        simhashes = array('Q')
+        str_offsets = array('I', [0])
+        post_offsets = array('I', [0])
+        bigram_offsets = array('I', [0])
+        postings = array('I')
+        str_blob = bytearray()
+        bigram_blob = bytearray()
+        bigram_ids = {}
+        for rec in records:
+            ts.append(int(rec.get("ts", 0)))
+            simhashes.append(int(rec.get("simhash") or 0))
+            for field in _STORY_IDX_STR_FIELDS:
+                str_blob += (rec.get(field) or "").encode("utf-8")
+                str_offsets.append(len(str_blob))
+            for sig_field in _STORY_IDX_SIG_FIELDS:
+                for bg in sorted(rec.get(sig_field) or ()):
+                    bid = bigram_ids.get(bg)
+                    if bid is None:
+                        bid = bigram_ids[bg] = len(bigram_ids)
+                        bigram_blob += bg.encode("utf-8")
+                        bigram_offsets.append(len(bigram_blob))
+                    postings.append(bid)
+                post_offsets.append(len(postings))
+        for arr in (ts, simhashes, str_offsets, post_offsets, bigram_offsets, postings):
+            if sys.byteorder != "little":
+                arr.byteswap()
+        payload = b"".join([
+            ts.tobytes(), simhashes.tobytes(), str_offsets.tobytes(), post_offsets.tobytes(),
+            bigram_offsets.tobytes(), postings.tobytes(), bytes(str_blob), bytes(bigram_blob),
+        ])
+        header = _STORY_IDX_HEADER.pack(
+            _STORY_IDX_MAGIC, _STORY_IDX_VERSION, 0, len(ts), len(bigram_ids),
+            src_size, _jsonl_head_crc(SENT_STORIES_FILE, src_size), zlib.crc32(payload),
+        )
+        parent = os.path.dirname(SENT_STORIES_INDEX_FILE)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+        tmp = SENT_STORIES_INDEX_FILE + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp, SENT_STORIES_INDEX_FILE)
+    except Exception as e:
+        print(f"Error saving sent-stories index: {e}")
+
+
+def _load_story_index(cutoff: float):
+    """Load the binary snapshot. Returns (records, covered_bytes), or (None, 0)
+    when the snapshot is missing, stale or corrupt."""
+    try:
+        if not os.path.exists(SENT_STORIES_INDEX_FILE) or os.path.getsize(SENT_STORIES_INDEX_FILE) < _STORY_IDX_HEADER.size:
+            return None, 0
+        with open(SENT_STORIES_INDEX_FILE, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, _flags, count, nbig, src_size, head_crc, payload_crc = _STORY_IDX_HEADER.unpack_from(mm, 0)
+            if magic != _STORY_IDX_MAGIC or version != _STORY_IDX_VERSION:
+                return None, 0
+            if os.path.getsize(SENT_STORIES_FILE) < src_size or _jsonl_head_crc(SENT_STORIES_FILE, src_size) != head_crc:
+                return None, 0
+            mv = memoryview(mm)
+            try:
+                payload = mv[_STORY_IDX_HEADER.size:]
+                if zlib.crc32(payload) != payload_crc:
+                    print("Sent-stories index checksum mismatch; rebuilding from JSONL")
+                    return None, 0
+                pos = 0
+
+                def _take(typecode, n):
+                    nonlocal pos
+                    arr = array(typecode)
+                    size = arr.itemsize * n
+                    arr.frombytes(payload[pos:pos + size])
+                    if sys.byteorder != "little":
+                        arr.byteswap()
+                    pos += size
+                    return arr
+
+                nfields = len(_STORY_IDX_STR_FIELDS)
+                nsigs = len(_STORY_IDX_SIG_FIELDS)
+                ts = _take('q', count)
+                simhashes = _take('Q', count)
+                str_offsets = _take('I', count * nfields + 1)
+                post_offsets = _take('I', count * nsigs + 1)
+                bigram_offsets = _take('I', nbig + 1)
+                postings = _take('I', post_offsets[-1])
+                str_blob = bytes(payload[pos:pos + str_offsets[-1]])
+                pos += str_offsets[-1]
+                bigram_blob = bytes(payload[pos:pos + bigram_offsets[-1]])
+            finally:
+                payload = None
+                mv.release()
+        bigrams = [bigram_blob[bigram_offsets[i]:bigram_offsets[i + 1]].decode("utf-8") for i in range(nbig)]
+        out = []
+        for i in range(count):
+            if ts[i] < cutoff:
+                continue
+            rec = {"ts": ts[i], "simhash": simhashes[i]}
+            base = i * nfields
+            for j, field in enumerate(_STORY_IDX_STR_FIELDS):
+                rec[field] = str_blob[str_offsets[base + j]:str_offsets[base + j + 1]].decode("utf-8")
+            for j, sig_field in enumerate(_STORY_IDX_SIG_FIELDS):
+                k = i * nsigs + j
+                rec[sig_field] = frozenset(bigrams[b] for b in postings[post_offsets[k]:post_offsets[k + 1]])
+            rec["fp_version"] = _FP_VERSION
+            rec["_fp"] = (frozenset(rec["entities"].split()), frozenset(rec["numbers"].split()))
+            out.append(rec)
+        return out, src_size
+    except Exception as e:
+        print(f"Error loading sent-stories index: {e}")
+        return None, 0
+
+
 def load_sent_stories():
     """Load stories sent within the dedup window. Returns a list of dicts with
-    a precomputed _sig field for fast similarity checks."""
+    precomputed _sig/_orig_sig/_fp fields for fast similarity checks. Uses the binary
+    snapshot when valid and only parses JSONL lines appended after it."""
     cutoff = time.time() - DEDUP_WINDOW_HOURS * 3600
     out = []
     if not os.path.exists(SENT_STORIES_FILE):
         print(f"No sent-stories file yet at {SENT_STORIES_FILE}")
         return out
     try:
-        with open(SENT_STORIES_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
+        snapshot, offset = _load_story_index(cutoff)
+        if snapshot is not None:
+            out = snapshot
+        parsed = 0
+        with open(SENT_STORIES_FILE, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial trailing line; leave it for the next load
+                offset += len(raw)
+                parsed += 1
+                line = raw.strip()
                 if not line:
                     continue
                 try:
@@ -498,54 +875,183 @@ def load_sent_stories():
                     continue
                 if rec.get("ts", 0) < cutoff:
                     continue
-                rec["_sig"] = _story_signature(rec.get("title", ""))
-                out.append(rec)
-        print(f"Loaded {len(out)} sent stories within last {DEDUP_WINDOW_HOURS}h (window dedup)")
+                out.append(_with_story_sigs(rec))
+        if snapshot is None or parsed:
+            _save_story_index(out, offset)
+        src = "index" if snapshot is not None else "JSONL"
+        print(f"Loaded {len(out)} sent stories within last {DEDUP_WINDOW_HOURS}h (window dedup, from {src} + {parsed} new line(s))")
     except Exception as e:
         print(f"Error loading sent stories: {e}")
     return out
 
 
-def append_sent_story(url: str, title: str, source: str):
-    """Append a single sent story to the JSONL log."""
+def append_sent_story(url: str, title: str, source: str, simhash: int = 0, orig_title: str = ""):
+    """Append a single sent story to the JSONL log. Returns the record with
+    its in-memory similarity fields, ready to add to the sent_stories list."""
+    rec = {
+        "ts": int(time.time()),
+        "url": url or "",
+        "title": title or "",
+        "title_key": _norm_title_key(title or ""),
+        "source": source or "",
+        "simhash": int(simhash or 0),
+        "orig_title": orig_title or "",
+        "orig_title_key": _norm_title_key(orig_title or ""),
+    }
+    ents, nums = _entity_fingerprint(f"{orig_title or ''} {title or ''}")
+    rec["entities"] = " ".join(sorted(ents))
+    rec["numbers"] = " ".join(sorted(nums))
+    rec["fp_version"] = _FP_VERSION
     try:
         parent = os.path.dirname(SENT_STORIES_FILE)
         if parent and not os.path.exists(parent):
             os.makedirs(parent, exist_ok=True)
-        rec = {
-            "ts": int(time.time()),
-            "url": url or "",
-            "title": title or "",
-            "title_key": _norm_title_key(title or ""),
-            "source": source or "",
-        }
         with open(SENT_STORIES_FILE, 'a', encoding='utf-8') as f:
             f.write(json.dumps(rec, ensure_ascii=False) + "\n")
     except Exception as e:
         print(f"Error appending sent story: {e}")
+    return _with_story_sigs(rec)
+
+
+# ---------------------------------------------------------------------------
+# Body-level (SimHash) deduplication
+# ---------------------------------------------------------------------------
+# Title similarity misses the same story published under different headlines.
+# After the article is fetched we compute a 64-bit SimHash over its text
+# (term-frequency weighted words for Latin text, character bigrams for CJK)
+# and compare it against stories already pushed; a small Hamming distance
+# means the bodies are near-duplicates and the LLM call can be skipped.
+
+# Max Hamming distance (bits out of 64) for two bodies to count as the same story.
+try:
+    SIMHASH_MAX_DISTANCE = int(os.environ.get("SIMHASH_MAX_DISTANCE", "3"))
+except Exception:
+    SIMHASH_MAX_DISTANCE = 3
+
+# Texts shorter than this are not fingerprinted (too few features to be reliable).
+try:
+    SIMHASH_MIN_TEXT_LEN = int(os.environ.get("SIMHASH_MIN_TEXT_LEN", "300"))
+except Exception:
+    SIMHASH_MIN_TEXT_LEN = 300
+
+_SIMHASH_WORD_RE = re.compile(r"[a-z0-9]+(?:[.,'][a-z0-9]+)*")
+_SIMHASH_CJK_RE = re.compile(r"[\u4e00-\u9fff]+")
+
+
+def _simhash64(text: str) -> int:
+    """64-bit SimHash of article text. Returns 0 when the text is too short."""
+    if not text or len(text) < SIMHASH_MIN_TEXT_LEN:
+        return 0
+    lower = text.lower()
+    features = {}
+    for f in _SIMHASH_WORD_RE.findall(lower):
+        features[f] = features.get(f, 0) + 1
+    for run in _SIMHASH_CJK_RE.findall(lower):
+        for i in range(len(run) - 1):
+            f = run[i:i + 2]
+            features[f] = features.get(f, 0) + 1
+    if not features:
+        return 0
+    weights = [0] * 64
+    for f, w in features.items():
+        h = _hash64(f)
+        for bit in range(64):
+            if (h >> bit) & 1:
+                weights[bit] += w
+            else:
+                weights[bit] -= w
+    fp = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fp |= 1 << bit
+    return fp
+
+
+class SimHashIndex:
+    """Hamming-distance lookup over 64-bit SimHashes.
+
+    Fingerprints are split into max_distance + 1 bands; by pigeonhole, two
+    fingerprints within max_distance bits agree exactly on at least one band,
+    so only entries sharing a band are compared.
+    """
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max(0, int(max_distance))
+        nbands = self.max_distance + 1
+        width = 64 // nbands
+        self._bands = [(i * width, 64 if i == nbands - 1 else (i + 1) * width) for i in range(nbands)]
+        self._buckets = {}
+
+    def _keys(self, fp: int):
+        for i, (lo, hi) in enumerate(self._bands):
+            yield (i, (fp >> lo) & ((1 << (hi - lo)) - 1))
+
+    def add(self, fp: int, rec):
+        if not fp:
+            return
+        for k in self._keys(fp):
+            self._buckets.setdefault(k, []).append((fp, rec))
+
+    def find(self, fp: int):
+        """Return the closest record within max_distance bits, else None."""
+        if not fp:
+            return None
+        best, best_dist = None, self.max_distance + 1
+        for k in self._keys(fp):
+            for other, rec in self._buckets.get(k, ()):
+                dist = (fp ^ other).bit_count()
+                if dist < best_dist:
+                    best, best_dist = rec, dist
+        return best
+
+
+def _title_matches(key, sig, rec_key, rec_sig) -> bool:
+    if not rec_key:
+        return False
+    if key == rec_key:
+        return True
+    if len(key) < MIN_TITLE_LEN_FOR_SIM or len(rec_key) < MIN_TITLE_LEN_FOR_SIM or not rec_sig:
+        return False
+    return _jaccard(sig, rec_sig) >= SIM_TITLE_THRESHOLD
+
+
+def _fingerprints_match(fp, rec_fp) -> bool:
+    """Entity/number fingerprint match. Needs at least one shared name and one
+    shared figure, ENTITY_FP_MIN_SHARED shared tokens in total, and the shared
+    tokens must cover ENTITY_FP_MIN_RATIO of the larger fingerprint (a short
+    title is not a duplicate just because a long one contains its words)."""
+    if not fp or not rec_fp or not any(fp) or not any(rec_fp):
+        return False
+    ents, nums = fp
+    rec_ents, rec_nums = rec_fp
+    shared_ents = len(ents & rec_ents)
+    shared_nums = len(nums & rec_nums)
+    if not shared_ents or not shared_nums:
+        return False
+    shared = shared_ents + shared_nums
+    larger = max(len(ents) + len(nums), len(rec_ents) + len(rec_nums))
+    return shared >= ENTITY_FP_MIN_SHARED and shared / larger >= ENTITY_FP_MIN_RATIO
 
 
 def is_similar_to_sent(title: str, sent_stories):
     """Return the matching sent record if a similar story was already pushed,
-    else None. Uses exact title_key fast path then bigram Jaccard."""
+    else None. Compares the (original feed) title against both the original
+    and the final LLM title of each sent story: exact title_key fast path,
+    then bigram Jaccard, then the language-independent entity/number
+    fingerprint (which survives the LLM's translation to Chinese)."""
     if not title or not sent_stories:
         return None
     key = _norm_title_key(title)
     if not key:
         return None
     sig = _story_signature(title)
-    short_title = len(key) < MIN_TITLE_LEN_FOR_SIM
+    fp = _entity_fingerprint(title)
     for rec in sent_stories:
-        if key and rec.get("title_key") == key:
+        if _title_matches(key, sig, rec.get("title_key"), rec.get("_sig")):
             return rec
-        if short_title:
-            continue
-        rec_sig = rec.get("_sig")
-        if not rec_sig:
-            continue
-        if len(rec.get("title_key") or "") < MIN_TITLE_LEN_FOR_SIM:
-            continue
-        if _jaccard(sig, rec_sig) >= SIM_TITLE_THRESHOLD:
+        if _title_matches(key, sig, rec.get("orig_title_key"), rec.get("_orig_sig")):
+            return rec
+        if _fingerprints_match(fp, rec.get("_fp")):
             return rec
     return None
 
@@ -584,13 +1090,199 @@ def dedup_batch(items):
         print(f"🧹 In-batch similarity dedup removed {dropped} item(s); {len(kept)} remain")
     return kept
 
-def has_brand_keywords(title):
-    """Check if title contains Xiaomi, REDMI, POCO, or mijia brand keywords (case-insensitive)."""
-    if not title:
-        return False
-    title_lower = title.lower()
-    brand_keywords = ['xiaomi', 'redmi', 'poco', 'mijia']
-    return any(keyword in title_lower for keyword in brand_keywords)
+
+# ---------------------------------------------------------------------------
+# Story cluster cache (summary reuse across near-duplicates)
+# ---------------------------------------------------------------------------
+# Generated Chinese title / summary / category per story cluster. A later
+# member of the same story (another outlet, a retry after a failed push, an
+# item the prepare stage summarized but the cycle never reached) reuses the
+# stored output instead of paying for another MiMo/Gemini call. Membership is
+# stricter than story dedup, since serving another story's summary is worse
+# than pushing a duplicate: same URL, body SimHash, or title bigram Jaccard of
+# at least STORY_CLUSTER_TITLE_SIM against the original or the LLM title (no
+# entity fingerprint).
+STORY_CLUSTER_FILE = os.environ.get("STORY_CLUSTER_PATH", "logs/story_clusters.jsonl").strip() or "logs/story_clusters.jsonl"
+try:
+    STORY_CLUSTER_TTL_HOURS = float(os.environ.get("STORY_CLUSTER_TTL_HOURS", str(DEDUP_WINDOW_HOURS)))
+except Exception:
+    STORY_CLUSTER_TTL_HOURS = float(DEDUP_WINDOW_HOURS)
+try:
+    STORY_CLUSTER_MAX_ITEMS = int(os.environ.get("STORY_CLUSTER_MAX_ITEMS", "500"))
+except Exception:
+    STORY_CLUSTER_MAX_ITEMS = 500
+
+try:
+    STORY_CLUSTER_TITLE_SIM = float(os.environ.get("STORY_CLUSTER_TITLE_SIM", "0.85"))
+except Exception:
+    STORY_CLUSTER_TITLE_SIM = 0.85
+
+_CLUSTER_PERSIST_FIELDS = ("id", "ts", "url", "title", "orig_title", "summary", "category", "provider", "simhash")
+
+
+def _title_category(title: str) -> str:
+    """The 【分类】 label of an LLM title if it is an allowed category, else ""."""
+    t = (title or "").strip()
+    if t.startswith("【") and "】" in t:
+        label = t[1:t.find("】")]
+        if label in ALLOWED_LLM_CATEGORIES:
+            return label
+    return ""
+
+
+def _story_probe(it, simhash: int = 0):
+    """Similarity fields of a feed item, in the shape _story_matches expects."""
+    title = it.get("orig_title") or it.get("title") or ""
+    return {
+        "url": it.get("url", ""),
+        "key": _norm_title_key(title),
+        "sig": _story_signature(title),
+        "simhash": int(simhash or 0),
+    }
+
+
+def _story_matches(probe, rec) -> bool:
+    """Same story for result reuse: URL, near-identical title or SimHash body."""
+    if probe["url"] and probe["url"] == rec.get("url"):
+        return True
+    key = probe["key"]
+    for rec_key, rec_sig in ((rec.get("title_key"), rec.get("_sig")), (rec.get("orig_title_key"), rec.get("_orig_sig"))):
+        if not key or not rec_key:
+            continue
+        if key == rec_key:
+            return True
+        if (len(key) >= MIN_TITLE_LEN_FOR_SIM and len(rec_key) >= MIN_TITLE_LEN_FOR_SIM and rec_sig
+                and _jaccard(probe["sig"], rec_sig) >= STORY_CLUSTER_TITLE_SIM):
+            return True
+    other = rec.get("simhash") or 0
+    return bool(probe["simhash"] and other and (probe["simhash"] ^ other).bit_count() <= SIMHASH_MAX_DISTANCE)
+
+
+class StoryClusterCache:
+    """Append-only JSONL store of one generated result per story cluster.
+
+    Records carry the same similarity fields as sent-story records; lookups
+    scan newest first. Re-putting a member of a known cluster replaces that
+    cluster's result (e.g. with the title after regeneration).
+    """
+
+    def __init__(self, path=STORY_CLUSTER_FILE, ttl_sec=STORY_CLUSTER_TTL_HOURS * 3600, max_items=STORY_CLUSTER_MAX_ITEMS):
+        self.path = path
+        self.ttl_sec = float(ttl_sec)
+        self.max_items = max(0, int(max_items))
+        self.enabled = self.ttl_sec > 0 and self.max_items > 0
+        self._clusters = {}
+        self._file_lines = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        if self.enabled:
+            self._load()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl_sec
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._file_lines += 1
+                    try:
+                        rec = json.loads(line)
+                        if rec["ts"] >= cutoff:
+                            self._clusters.pop(rec["id"], None)
+                            self._clusters[rec["id"]] = self._indexed(rec)
+                    except Exception:
+                        continue
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️  Could not load story cluster cache: {e}")
+            return
+        self._evict()
+        if self._clusters:
+            print(f"🧩 Loaded {len(self._clusters)} cached story clusters")
+
+    @staticmethod
+    def _indexed(rec):
+        rec["title_key"] = _norm_title_key(rec.get("title", ""))
+        rec.pop("entities", None)
+        return _with_story_sigs(rec)
+
+    def _evict(self):
+        while len(self._clusters) > self.max_items:
+            del self._clusters[next(iter(self._clusters))]
+
+    def _find_locked(self, probe):
+        cutoff = time.time() - self.ttl_sec
+        for rec in reversed(list(self._clusters.values())):
+            if rec["ts"] < cutoff:
+                break
+            if _story_matches(probe, rec):
+                return rec
+        return None
+
+    def find(self, it, simhash: int = 0):
+        """Cluster record matching a feed item, else None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            rec = self._find_locked(_story_probe(it, simhash))
+            if rec is not None:
+                self.hits += 1
+            return rec
+
+    def put(self, it, chinese_title: str, summary: str, provider: str, simhash: int = 0):
+        """Store a generated result for the item's cluster; sets it["_cluster_id"]."""
+        if not self.enabled or not chinese_title or not summary:
+            return
+        with self._lock:
+            rec = self._clusters.get(it.get("_cluster_id")) or self._find_locked(_story_probe(it, simhash))
+            cluster_id = rec["id"] if rec else hashlib.sha1((it.get("url") or chinese_title).encode("utf-8")).hexdigest()[:12]
+            new = {
+                "id": cluster_id,
+                "ts": time.time(),
+                "url": (rec or {}).get("url") or it.get("url", ""),
+                "title": chinese_title,
+                "orig_title": (rec or {}).get("orig_title") or it.get("orig_title") or "",
+                "summary": summary,
+                "category": _title_category(chinese_title),
+                "provider": provider or "",
+                "simhash": int(simhash or (rec or {}).get("simhash") or 0),
+            }
+            self._clusters.pop(cluster_id, None)
+            self._clusters[cluster_id] = self._indexed(dict(new))
+            self._evict()
+            it["_cluster_id"] = cluster_id
+            try:
+                if self._file_lines >= 2 * max(self.max_items, 1):
+                    self._rewrite()
+                else:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(new, ensure_ascii=False) + "\n")
+                    self._file_lines += 1
+            except Exception as e:
+                print(f"⚠️  Could not persist story cluster: {e}")
+
+    def _rewrite(self):
+        tmp = self.path + ".tmp"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in self._clusters.values():
+                f.write(json.dumps({k: rec.get(k) for k in _CLUSTER_PERSIST_FIELDS}, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        self._file_lines = len(self._clusters)
+
+
+STORY_CLUSTERS = StoryClusterCache()
+
+
+def cached_story_summary(it, simhash: int = 0):
+    """(chinese_title, summary, provider) from the item's story cluster, else None."""
+    rec = STORY_CLUSTERS.find(it, simhash)
+    if rec is None:
+        return None
+    it["_cluster_id"] = rec["id"]
+    print(f"  🧩 Reusing summary of story cluster {rec['id']} ({rec.get('provider') or 'cache'}): {rec['title'][:40]}...")
+    return rec["title"], rec["summary"], rec.get("provider") or "cache"
 
 def _extract_source_from_url(url):
     """Extract source name from article URL"""
@@ -702,28 +1394,91 @@ _DEFAULT_CHINESE_NAME_MAP = {
     "William Ding": "丁磊",
 }
 
+# Optional JSON file ({"English Name": "中文名", ...}) merged over the defaults
+# and re-read whenever its mtime changes, so the map can grow without a restart.
+CHINESE_NAME_MAP_FILE = os.environ.get("CHINESE_NAME_MAP_PATH", "").strip()
+
+# How often (seconds) to stat CHINESE_NAME_MAP_FILE for changes.
+try:
+    CHINESE_NAME_MAP_RELOAD_SEC = float(os.environ.get("CHINESE_NAME_MAP_RELOAD_SEC", "30"))
+except Exception:
+    CHINESE_NAME_MAP_RELOAD_SEC = 30.0
+
+def _valid_name_entries(raw, origin: str) -> dict:
+    """String -> non-empty string entries of a user name map; others are skipped with a warning."""
+    if not isinstance(raw, dict):
+        print(f"⚠️  Ignoring Chinese name map from {origin}: expected a JSON object")
+        return {}
+    valid = {k: v for k, v in raw.items() if isinstance(k, str) and k and isinstance(v, str) and v}
+    skipped = [k for k in raw if k not in valid]
+    if skipped:
+        print(f"⚠️  Skipping {len(skipped)} invalid Chinese name map entr{'y' if len(skipped) == 1 else 'ies'} "
+              f"from {origin} (names and translations must be non-empty strings): {', '.join(map(str, skipped[:5]))}")
+    return valid
+
 def _load_chinese_name_map():
+    """Defaults, then CHINESE_NAME_MAP_FILE, then the CHINESE_NAME_MAP env JSON.
+    Entries are type-checked here once, so _apply_chinese_name_map can trust them."""
+    merged = dict(_DEFAULT_CHINESE_NAME_MAP)
+    if CHINESE_NAME_MAP_FILE:
+        try:
+            with open(CHINESE_NAME_MAP_FILE, 'r', encoding='utf-8') as f:
+                file_map = json.load(f)
+            merged.update(_valid_name_entries(file_map, CHINESE_NAME_MAP_FILE))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️  Failed to load Chinese name map file {CHINESE_NAME_MAP_FILE}: {e}")
     try:
         env_json = os.getenv("CHINESE_NAME_MAP", "").strip()
         if env_json:
-            import json as _json
-            user_map = _json.loads(env_json)
-            if isinstance(user_map, dict):
-                return {**_DEFAULT_CHINESE_NAME_MAP, **user_map}
-    except Exception:
-        pass
-    return dict(_DEFAULT_CHINESE_NAME_MAP)
+            merged.update(_valid_name_entries(json.loads(env_json), "CHINESE_NAME_MAP"))
+    except Exception as e:
+        print(f"⚠️  Failed to parse CHINESE_NAME_MAP: {e}")
+    return merged
+
+def _compile_chinese_name_map(name_map):
+    """One alternation over all names, longest first so the longest name wins."""
+    if not name_map:
+        return None
+    names = sorted(name_map, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(re.escape(n) for n in names) + r")\b")
+
+def _name_map_mtime():
+    try:
+        return os.stat(CHINESE_NAME_MAP_FILE).st_mtime_ns if CHINESE_NAME_MAP_FILE else None
+    except OSError:
+        return None
 
 CHINESE_NAME_MAP = _load_chinese_name_map()
+_CHINESE_NAME_RE = _compile_chinese_name_map(CHINESE_NAME_MAP)
+_name_map_state = {"mtime": _name_map_mtime(), "checked_at": time.time()}
+
+def _maybe_reload_chinese_name_map():
+    global CHINESE_NAME_MAP, _CHINESE_NAME_RE
+    if not CHINESE_NAME_MAP_FILE:
+        return
+    now = time.time()
+    if now - _name_map_state["checked_at"] < CHINESE_NAME_MAP_RELOAD_SEC:
+        return
+    _name_map_state["checked_at"] = now
+    mtime = _name_map_mtime()
+    if mtime == _name_map_state["mtime"]:
+        return
+    _name_map_state["mtime"] = mtime
+    new_map = _load_chinese_name_map()
+    CHINESE_NAME_MAP, _CHINESE_NAME_RE = new_map, _compile_chinese_name_map(new_map)
+    print(f"🔄 Reloaded Chinese name map: {len(new_map)} entries")
 
 def _apply_chinese_name_map(text: str) -> str:
     try:
         if not text:
             return text
-        out = text
-        for en, zh in CHINESE_NAME_MAP.items():
-            out = re.sub(rf"\b{re.escape(en)}\b", zh, out)
-        return out
+        _maybe_reload_chinese_name_map()
+        pattern, name_map = _CHINESE_NAME_RE, CHINESE_NAME_MAP
+        if pattern is None:
+            return text
+        return pattern.sub(lambda m: name_map[m.group(0)], text)
     except Exception:
         return text
 def _resolve_actual_url(url: str) -> str:
@@ -754,7 +1509,7 @@ def _resolve_actual_url(url: str) -> str:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
             }
-            r = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
+            r = requests.get(url, headers=headers, timeout=_stage_timeout(15), allow_redirects=True)
             final_url = r.url or url
             if final_url != url:
                 print(f"  🔗 Resolved redirect URL: {final_url}")
@@ -768,7 +1523,11 @@ def _resolve_actual_url(url: str) -> str:
 
 
 def read_article_content(url):
-    """Read and extract the main content from an article URL"""
+    """Read and extract the main content from an article URL.
+    Timeouts are clamped to the current item deadline (see _stage_timeout)."""
+    if _deadline_expired():
+        print(f"  ⏱️  Item deadline exhausted; skipping article fetch")
+        return ""
     try:
         resolved_url = _resolve_actual_url(url)
         if resolved_url != url:
@@ -787,7 +1546,7 @@ def read_article_content(url):
             'Pragma': 'no-cache',
         }
         
-        response = requests.get(resolved_url, headers=headers, timeout=20, allow_redirects=True)
+        response = requests.get(resolved_url, headers=headers, timeout=_stage_timeout(20), allow_redirects=True)
         print(f"  📡 Response status: {response.status_code}, Content length: {len(response.content)}")
         
         if response.status_code != 200:
@@ -814,7 +1573,7 @@ def read_article_content(url):
             headers['User-Agent'] = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
             print(f"  🔄 Retrying with different User-Agent...")
             try:
-                response = requests.get(resolved_url, headers=headers, timeout=20, allow_redirects=True)
+                response = requests.get(resolved_url, headers=headers, timeout=_stage_timeout(20), allow_redirects=True)
                 print(f"  📡 Retry response: {response.status_code}, Content length: {len(response.content)}")
             except Exception as e:
                 print(f"  ❌ Retry failed: {e}")
@@ -834,8 +1593,10 @@ def read_article_content(url):
                 if not amp_url.startswith('http'):
                     from urllib.parse import urljoin
                     amp_url = urljoin(resolved_url, amp_url)
+                if _deadline_expired():
+                    raise DeadlineExceeded("no time left for AMP fetch")
                 print(f"  🔁 Following AMP page for cleaner content: {amp_url}")
-                amp_resp = requests.get(amp_url, headers=headers, timeout=15, allow_redirects=True)
+                amp_resp = requests.get(amp_url, headers=headers, timeout=_stage_timeout(15), allow_redirects=True)
                 if amp_resp.status_code == 200 and 'html' in amp_resp.headers.get('content-type','').lower():
                     amp_soup = BeautifulSoup(amp_resp.content, 'html.parser')
                     amp_paras = amp_soup.find_all('p')
@@ -1098,6 +1859,85 @@ def extract_cover_image_from_html(html, base_url):
         pass
     return None
 
+class KeywordAutomaton:
+    """Aho-Corasick matcher for many keywords in a single pass over the text.
+
+    Each keyword carries a payload. Keywords added with word_boundary=True only
+    match where re's \\b would match at both ends (so 'act' does not fire
+    inside 'impact').
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    def add(self, keyword: str, payload, word_boundary: bool = False):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(keyword), payload, word_boundary))
+        self._built = False
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        for s in queue:
+            self._fail[s] = 0
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str):
+        """Yield (start, end, payload) for every (possibly overlapping) match."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        n = len(text)
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            for length, payload, word_boundary in out[state]:
+                start = end - length
+                if word_boundary and not (
+                    _is_word_boundary(text, start, n) and _is_word_boundary(text, end, n)
+                ):
+                    continue
+                yield start, end, payload
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _is_word_boundary(text: str, pos: int, n: int) -> bool:
+    """Same rule as re's \\b: word-ness differs on the two sides of pos."""
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < n and _is_word_char(text[pos])
+    return before != after
+
+
 BRAND_PATTERNS = {
     'xiaomi': ['xiaomi', 'mi ', 'redmi', 'poco'],
     'samsung': ['samsung', 'galaxy'],
@@ -1112,15 +1952,85 @@ BRAND_PATTERNS = {
     'motorola': ['motorola', 'moto']
 }
 
-def detect_brand(text: str) -> str:
-    """Detect primary brand from text."""
+# Title keywords that mark an item as Xiaomi-family news (sorted first).
+XIAOMI_BRAND_KEYWORDS = ('xiaomi', 'redmi', 'poco', 'mijia')
+
+# Model-number shapes, matched on lowercased text
+_MODEL_PATTERNS = [
+    re.compile(r'\b[a-z]+\s*\d{2,4}[a-z]*\b'),  # Like "X300", "Y28", "15T"
+    re.compile(r'\b[a-z]+\s*[a-z]+\s*\d+[a-z]*\b'),  # Like "iPhone 15", "Redmi Note 12"
+]
+
+Entities = namedtuple("Entities", "brands products primary_brand has_xiaomi_keyword")
+
+
+def _build_brand_automaton():
+    automaton = KeywordAutomaton()
+    for brand, patterns in BRAND_PATTERNS.items():
+        for p in patterns:
+            automaton.add(p, brand)
+    for kw in XIAOMI_BRAND_KEYWORDS:
+        automaton.add(kw, None)
+    return automaton.build()
+
+
+_BRAND_AUTOMATON = _build_brand_automaton()
+
+
+@lru_cache(maxsize=512)
+def extract_entities(text: str) -> Entities:
+    """Brands and product/model mentions in text, computed once per distinct
+    string and shared by the prompt builders, detect_brand,
+    has_brand_keywords and the sort key.
+
+    brands keeps BRAND_PATTERNS order, so brands[0] is what detect_brand
+    has always returned.
+    """
     if not text:
-        return "other"
+        return Entities((), (), "other", False)
     lower = text.lower()
-    for brand, patterns in BRAND_PATTERNS.items():
-        if any(p in lower for p in patterns):
-            return brand
-    return "other"
+    found = set()
+    xiaomi_kw = False
+    for _s, _e, brand in _BRAND_AUTOMATON.iter_matches(lower):
+        if brand is None:
+            xiaomi_kw = True
+        else:
+            found.add(brand)
+    brands = tuple(b for b in BRAND_PATTERNS if b in found)
+    products = []
+    seen = set()
+    for pattern in _MODEL_PATTERNS:
+        for match in pattern.findall(lower):
+            if len(match) > 3 and match not in seen:
+                seen.add(match)
+                products.append(match.title())
+    return Entities(brands, tuple(products), brands[0] if brands else "other", xiaomi_kw)
+
+
+def item_entities(it: dict) -> Entities:
+    """Entities of an item's original feed title, cached on the item."""
+    title = it.get("orig_title") or it.get("title") or ""
+    cached = it.get("_title_entities")
+    if cached is None or cached[0] != title:
+        cached = it["_title_entities"] = (title, extract_entities(title))
+    return cached[1]
+
+
+def _entities_prompt_context(entities: Entities):
+    """Products/brands lines for the LLM prompt."""
+    products_context = f"Products mentioned in source: {', '.join(entities.products)}" if entities.products else "No specific products mentioned"
+    brands_context = f"Brands mentioned in source: {', '.join(b.title() for b in entities.brands)}" if entities.brands else "No specific brands mentioned"
+    return products_context, brands_context
+
+
+def has_brand_keywords(title):
+    """Check if title contains Xiaomi, REDMI, POCO, or mijia brand keywords (case-insensitive)."""
+    return extract_entities(title or "").has_xiaomi_keyword
+
+
+def detect_brand(text: str) -> str:
+    """Detect primary brand from text."""
+    return extract_entities(text or "").primary_brand
 
 def brand_category(brand: str) -> str:
     """Map brand to Xiaomi vs Competitor."""
@@ -1157,103 +2067,250 @@ def map_category_to_bitable(chinese_category: str) -> str:
     }
     return mapping.get(category_lower, "Politics")  # Default to Politics if not found
 
+_AMOUNT = r"\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?"
+# ASCII-only token edges: unlike \b these still fire next to CJK characters,
+# so figures written inside Chinese summaries ("售价RM1,999起") are found.
+_NL = r"(?<![A-Za-z0-9])"
+_NR = r"(?![A-Za-z0-9])"
+
+# One scanner for every numeric fact: currency amounts, specs with units,
+# standalone numbers and bare currency codes. Alternatives are tried left to
+# right, so an amount is reported as a price/spec rather than a plain number.
+_NUMERIC_SCAN_RE = re.compile(
+    r"(?P<price>(?:" + _NL + r"(?P<code>RM|MYR|SGD|USD|EUR)\s?\$?|" + _NL + r"US\$|\$|£)\s?" + _AMOUNT + r")"
+    r"|(?P<spec>" + _NL + r"(?:\d{1,2}(?:\.\d)?\s?(?:inch|in|英寸)|\d{2,4}\s?(?:mAh|Hz)|\d{1,3}\s?(?:GB|TB|MP|W)"
+    r"|\d{2,4}x\d{2,4}|\d{2}\s?nm)" + _NR + r"|" + _NL + r"\d{2,3}%)"
+    r"|(?P<number>" + _NL + r"\d{1,3}(?:[,\.]\d{3})*(?:\.\d+)?" + _NR + r")"
+    r"|(?P<currency>" + _NL + r"(?:RM|MYR|USD|US\$|SGD|EUR|GBP)" + _NR + r")",
+    re.IGNORECASE,
+)
+_NUMERIC_CORE_RE = re.compile(r"\d[\d,.]*\d|\d")
+
+
+@lru_cache(maxsize=256)
+def _scan_numeric(text: str):
+    """Single pass over text. Returns frozensets (prices, currencies, numbers, specs).
+    The numeric part of every price/spec is also recorded as a number, so a
+    summary that writes "1,299令吉" is still grounded by a source "RM1,299"."""
+    prices, currencies, numbers, specs = set(), set(), set(), set()
+    for m in _NUMERIC_SCAN_RE.finditer(text or ""):
+        tok = m.group(0).strip()
+        if m.group("price"):
+            prices.add(tok)
+            if m.group("code"):
+                currencies.add(m.group("code").upper())
+        elif m.group("spec"):
+            specs.add(tok)
+        elif m.group("number"):
+            numbers.add(tok)
+            continue
+        else:
+            currencies.add(tok.upper())
+            continue
+        core = _NUMERIC_CORE_RE.search(tok)
+        if core:
+            numbers.add(core.group(0))
+    return frozenset(prices), frozenset(currencies), frozenset(numbers), frozenset(specs)
+
+
 def _extract_numeric_facts(text: str):
     """Extract numeric facts (prices, currencies, dates-like numbers) from text.
-    Returns a dict with sets: prices, currencies, numbers, raw_tokens.
+    Returns a dict with sets: prices, currencies, numbers, specs, raw_tokens.
+    Backed by a cached single-pass scan, so repeated calls on the same article are free.
     """
     try:
-        if not text:
-            return {"prices": set(), "currencies": set(), "numbers": set(), "raw_tokens": set()}
-        tokens = set()
-        prices = set()
-        currencies = set()
-        numbers = set()
-        specs = set()
-        # Common currency symbols and codes
-        currency_patterns = [r"RM\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?", r"MYR\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?", r"USD\s?\$?\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?", r"US\$\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?", r"\$\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?", r"SGD\s?\$?\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?", r"EUR\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?", r"£\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?"]
-        for pat in currency_patterns:
-            for m in re.findall(pat, text, flags=re.IGNORECASE):
-                prices.add(m.strip())
-                tokens.add(m.strip())
-        # Specs with units (e.g., 6.7-inch, 120Hz, 5000mAh, 12GB, 200MP, 120W)
-        spec_patterns = [
-            r"\b\d{1,2}(?:\.\d)?\s?(?:inch|in|英寸)\b",
-            r"\b\d{2,4}\s?mAh\b",
-            r"\b\d{2,4}\s?Hz\b",
-            r"\b\d{1,3}\s?(?:GB|TB)\b",
-            r"\b\d{1,3}\s?MP\b",
-            r"\b\d{1,3}\s?W\b",
-            r"\b\d{2,4}x\d{2,4}\b",
-            r"\b\d{2,3}%\b",
-            r"\b\d{2}\s?nm\b",
-        ]
-        for pat in spec_patterns:
-            for m in re.findall(pat, text, flags=re.IGNORECASE):
-                specs.add(m.strip())
-                tokens.add(m.strip())
-        # Standalone numbers (avoid years already captured by prices)
-        for m in re.findall(r"\b\d{1,3}(?:[,\.]\d{3})*(?:\.\d+)?\b", text):
-            numbers.add(m)
-            tokens.add(m)
-        # Currency mentions without amounts
-        for m in re.findall(r"\b(RM|MYR|USD|US\$|SGD|EUR|GBP)\b", text, flags=re.IGNORECASE):
-            currencies.add(m.upper())
-        # Merge specs into tokens
-        tokens |= specs
-        return {"prices": prices, "currencies": currencies, "numbers": numbers, "specs": specs, "raw_tokens": tokens}
+        prices, currencies, numbers, specs = _scan_numeric(text or "")
+        return {
+            "prices": set(prices), "currencies": set(currencies), "numbers": set(numbers),
+            "specs": set(specs), "raw_tokens": set(prices | specs | numbers),
+        }
     except Exception:
         return {"prices": set(), "currencies": set(), "numbers": set(), "specs": set(), "raw_tokens": set()}
 
+@lru_cache(maxsize=256)
+def _facts_block(text: str) -> str:
+    """Grounding facts for the LLM prompt (first 40 tokens, sorted)."""
+    prices, _currencies, numbers, specs = _scan_numeric(text or "")
+    return "\n".join(sorted(prices | specs | numbers)[:40])
+
 def _find_numeric_tokens(text: str):
     if not text:
         return set()
-    found = set()
-    # capture currency+amount and plain numbers
-    for m in re.findall(r"(RM\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?|MYR\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?|USD\s?\$?\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?|US\$\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?|SGD\s?\$?\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?|\$\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?|£\s?\d{1,3}(?:[,\s]\d{3})*(?:\.\d+)?|\b\d{1,3}(?:[,\.]\d{3})*(?:\.\d+)?\b|\b\d{1,2}(?:\.\d)?\s?(?:inch|in|英寸)\b|\b\d{2,4}\s?mAh\b|\b\d{2,4}\s?Hz\b|\b\d{1,3}\s?(?:GB|TB)\b|\b\d{1,3}\s?MP\b|\b\d{1,3}\s?W\b|\b\d{2,4}x\d{2,4}\b|\b\d{2}\s?nm\b|\b\d{2,3}%\b)", text, flags=re.IGNORECASE):
-        found.add(m.strip())
-    return found
+    prices, _currencies, numbers, specs = _scan_numeric(text)
+    return set(prices | specs | numbers)
+
+# Magnitude words and CJK date suffixes that follow a figure. "RM1.2 billion"
+# and "12亿令吉" are the same amount; "10月19日" renders "October 19".
+_MAGNITUDES = {"billion": 1e9, "bil": 1e9, "million": 1e6, "mil": 1e6, "thousand": 1e3,
+               "亿": 1e8, "万": 1e4, "千": 1e3}
+_SCALED_NUM_RE = re.compile(
+    r"(\d[\d,]*(?:\.\d+)?)\s?(?:(billion|bil|million|mil|thousand)(?![A-Za-z])|(亿|万|千)|([年月日号]))?",
+    re.IGNORECASE,
+)
+
+
+def _number_values(text: str):
+    """({digits: {value with its magnitude applied}}, {digits used as date parts})."""
+    values, date_parts = {}, set()
+    for m in _SCALED_NUM_RE.finditer(text or ""):
+        digits = m.group(1).rstrip(",")
+        if m.group(4):
+            date_parts.add(digits)
+            continue
+        try:
+            value = float(digits.replace(",", ""))
+        except ValueError:
+            continue
+        scale = _MAGNITUDES.get((m.group(2) or m.group(3) or "").lower(), 1)
+        values.setdefault(digits, set()).add(round(value * scale, 2))
+    return values, date_parts
+
+
+def _unsupported_numbers(summary: str, source_facts: dict, source_text: str = ""):
+    """Numeric tokens in summary that do not appear in the source facts.
+    With source_text, figures are also compared by value (magnitude words
+    applied on both sides) and date parts such as 10月 / 19日 are not checked."""
+    summary_nums = _find_numeric_tokens(summary)
+    if not summary_nums:
+        return set()
+    summary_values, date_parts = _number_values(summary) if source_text else ({}, set())
+    source_values = set().union(*_number_values(source_text)[0].values()) if source_text else set()
+    source_tokens = set(source_facts.get("raw_tokens", set())) | set(source_facts.get("prices", set())) | set(source_facts.get("numbers", set()))
+    # simple normalization: remove spaces and case, e.g. "RM 1,299" -> "rm1,299"
+    def _norm_tok(t):
+        return t.replace(" ", "").lower()
+    source_norm = {_norm_tok(t) for t in source_tokens}
+    unsupported = set()
+    for t in summary_nums:
+        if _norm_tok(t) in source_norm:
+            continue
+        # Units get translated ("6.7-inch" -> "6.7英寸"); the figure itself must match
+        core = _NUMERIC_CORE_RE.search(t)
+        if core and core.group(0) != t and core.group(0) in source_norm:
+            continue
+        if core and (core.group(0) in date_parts or summary_values.get(core.group(0), set()) & source_values):
+            continue
+        unsupported.add(t)
+    return unsupported
 
-def _numbers_consistent(summary: str, source_facts: dict) -> bool:
+def _numbers_consistent(summary: str, source_facts: dict, source_text: str = "") -> bool:
     """Return True if all numeric tokens in summary are present in source facts (prices/numbers)."""
     try:
         if not summary:
             return True
-        summary_nums = _find_numeric_tokens(summary)
-        if not summary_nums:
-            return True
-        source_tokens = set(source_facts.get("raw_tokens", set())) | set(source_facts.get("prices", set())) | set(source_facts.get("numbers", set()))
-        # simple normalization: remove spaces in currency like "RM 1,299" -> "RM1,299"
-        def _norm_set(s):
-            out = set()
-            for t in s:
-                out.add(t.replace(" ", ""))
-            return out
-        return _norm_set(summary_nums).issubset(_norm_set(source_tokens))
+        return not _unsupported_numbers(summary, source_facts, source_text)
     except Exception:
         return True
 
-def extract_cover_image(url):
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        }
-        r = requests.get(url, headers=headers, timeout=10)
-        if r.status_code != 200:
-            return None
-        return extract_cover_image_from_html(r.text, url)
-    except Exception:
-        return None
+# ---------------------------------------------------------------------------
+# Prompt budgeting: keep the salient sentences instead of the first N chars
+# ---------------------------------------------------------------------------
 
-def upload_image_to_feishu(token, image_url):
-    try:
-        r = requests.get(image_url, timeout=10)
-        if r.status_code != 200:
+# Approximate token budgets (see _estimate_tokens) for article text in the
+# summary prompt and for the excerpt attached to title-only regeneration.
+try:
+    PROMPT_ARTICLE_TOKEN_BUDGET = int(os.environ.get("PROMPT_ARTICLE_TOKEN_BUDGET", "1600"))
+except Exception:
+    PROMPT_ARTICLE_TOKEN_BUDGET = 1600
+try:
+    PROMPT_EXCERPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_EXCERPT_TOKEN_BUDGET", "1000"))
+except Exception:
+    PROMPT_EXCERPT_TOKEN_BUDGET = 1000
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'“‘(\[]?[A-Z0-9\u4e00-\u9fff])|(?<=[。！？；])|\n+")
+_SALIENCE_TERM_RE = re.compile(r"[a-z][a-z0-9'-]{2,}|\d[\d.,]*|[\u4e00-\u9fff]{2}")
+_SALIENCE_STOPWORDS = frozenset("""
+the and for that with this from have has had was were are will would been their they them its
+into over after about more than also said says which when where what who whom your you our
+not but can could may might just all any some such other new one two per via
+yang dan untuk dengan kepada dalam akan telah tidak ini itu oleh pada bagi dari adalah juga
+""".split())
+
+
+def _has_numeric_fact(sentence: str) -> bool:
+    """Price, spec, currency or a multi-digit figure (list numbering does not count)."""
+    for m in _NUMERIC_SCAN_RE.finditer(sentence):
+        if not m.group("number") or len(m.group(0)) >= 2:
+            return True
+    return False
+
+
+def _salience_terms(sentence: str):
+    return [t for t in _SALIENCE_TERM_RE.findall(sentence.lower()) if t not in _SALIENCE_STOPWORDS]
+
+
+def budget_article_text(text: str, max_tokens: int = PROMPT_ARTICLE_TOKEN_BUDGET, title: str = "") -> str:
+    """Fit article text into max_tokens by keeping its most salient sentences.
+
+    Sentences are scored by the document frequency of their content words,
+    overlap with the title and a small lead bonus; sentences that carry
+    numeric facts (prices, specs, figures) are taken first so the grounding
+    facts survive. Kept sentences are returned in their original order.
+    """
+    text = " ".join((text or "").split())
+    if max_tokens <= 0 or _estimate_tokens(text) <= max_tokens:
+        return text
+    sentences = [x.strip() for x in _SENTENCE_SPLIT_RE.split(text) if x and x.strip()]
+    if len(sentences) <= 1:
+        return text[: max_tokens * 3]
+    # Sentences repeated on the page (menus, share bars, newsletter blurbs)
+    # are boilerplate: drop them entirely and keep them out of the counts.
+    counts = {}
+    for x in sentences:
+        counts[x] = counts.get(x, 0) + 1
+    terms = {x: _salience_terms(x) for x in counts}
+    freq = {}
+    for x, ts in terms.items():
+        if counts[x] == 1:
+            for t in set(ts):
+                freq[t] = freq.get(t, 0) + 1
+    title_terms = set(_salience_terms(title))
+    ranked = []
+    for i, sent in enumerate(sentences):
+        ts = terms[sent]
+        has_fact = _has_numeric_fact(sent)
+        if counts[sent] > 1 or not ts or (len(ts) < 3 and not has_fact):
+            continue
+        score = sum(min(freq.get(t, 1), 4) - 1 for t in set(ts)) / (len(ts) ** 0.5)
+        score += 2.0 * len(title_terms.intersection(ts))
+        score += 1.5 / (1 + i)
+        ranked.append((not has_fact, -score, i))
+    ranked.sort()
+    keep, used = [], 0
+    for _, _, i in ranked:
+        cost = _estimate_tokens(sentences[i])
+        if used + cost > max_tokens:
+            continue
+        keep.append(i)
+        used += cost
+    if not keep:
+        return text[: max_tokens * 3]
+    return " ".join(sentences[i] for i in sorted(keep))
+
+def extract_cover_image(url):
+    try:
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        }
+        if _deadline_expired():
+            return None  # no time left: send without a cover image
+        r = requests.get(url, headers=headers, timeout=_stage_timeout(10))
+        if r.status_code != 200:
+            return None
+        return extract_cover_image_from_html(r.text, url)
+    except Exception:
+        return None
+
+def upload_image_to_feishu(token, image_url):
+    try:
+        r = requests.get(image_url, timeout=10)
+        if r.status_code != 200:
             return None
         files = {
             'image': ('cover.jpg', r.content, 'image/jpeg')
         }
         data = { 'image_type': 'message' }
-        up = requests.post(f"{BASE}/open-apis/im/v1/images", headers={'Authorization': f'Bearer {token}'}, files=files, data=data, timeout=20)
+        up = requests.post(f"{BASE}/open-apis/im/v1/images", headers={'Authorization': f'Bearer {token}'}, files=files, data=data, timeout=_stage_timeout(20, floor=5.0))
         up.raise_for_status()
         resp = up.json()
         if resp.get('code') == 0:
@@ -1263,124 +2320,1118 @@ def upload_image_to_feishu(token, image_url):
         print(f"image_upload_error: {e}")
     return None
 
-def gemini_summarize_from_url(title, article_url):
-    """Use Google Gemini AI to read and summarize the article directly from URL"""
-    if not GEMINI_AVAILABLE:
-        raise Exception("Gemini API not available")
-    
+# ---------------------------------------------------------------------------
+# Per-item deadlines and the per-thread call context
+# ---------------------------------------------------------------------------
+
+# Wall-clock budget for one item across fetch, LLM and send stages (0 = none).
+try:
+    ITEM_DEADLINE_SEC = float(os.environ.get("ITEM_DEADLINE_SEC", "120"))
+except Exception:
+    ITEM_DEADLINE_SEC = 120.0
+
+
+class LLMCallCancelled(Exception):
+    """Raised inside a provider call whose result is no longer wanted (hedge loser)."""
+
+
+class DeadlineExceeded(LLMCallCancelled):
+    """Raised when the current item's time budget has run out."""
+
+
+class Deadline:
+    """Time budget for one item. Stages clamp their timeouts to remaining()."""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds if seconds and seconds > 0 else None
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+# Per-thread call context, set by main() and the worker/hedge threads:
+#   .deadline - Deadline of the item being processed (or None)
+#   .cancel   - threading.Event set once nobody waits for this thread's LLM call
+#   .prompt_kind - prompt type the thread's LLM calls are recorded under
+_CALL_CONTEXT = threading.local()
+
+
+def _current_deadline():
+    """This thread's item Deadline, or None if there is none or it is unbounded
+    (ITEM_DEADLINE_SEC=0), so callers never clamp a wait to an infinite remaining()."""
+    deadline = getattr(_CALL_CONTEXT, "deadline", None)
+    return deadline if deadline is not None and deadline.expires_at is not None else None
+
+
+def _deadline_expired() -> bool:
+    deadline = _current_deadline()
+    return deadline is not None and deadline.expired()
+
+
+def _stage_timeout(default, floor: float = 1.0):
+    """Clamp a requests timeout (seconds or (connect, read)) to the item's remaining budget."""
+    deadline = _current_deadline()
+    if deadline is None:
+        return default
+    left = max(floor, deadline.remaining())
+    if isinstance(default, tuple):
+        return tuple(min(t, left) for t in default)
+    return min(default, left)
+
+
+def _run_with_deadline(seconds, fn, *args, cancel=None):
+    """Run fn(*args) in this thread under a fresh item Deadline (and, if given,
+    the submitting thread's cancel Event, so pool workers can be stopped too)."""
+    previous = _current_deadline()
+    previous_cancel = getattr(_CALL_CONTEXT, "cancel", None)
+    _CALL_CONTEXT.deadline = Deadline(seconds)
+    if cancel is not None:
+        _CALL_CONTEXT.cancel = cancel
     try:
-        print(f"  🤖 Gemini reading and summarizing: {title[:50]}...")
-        
-        # Read article content first
-        article_content = read_article_content(article_url)
-        if not article_content or len(article_content.strip()) < 50:
-            raise Exception("Failed to read article content or content too short")
-        
-        # Extract facts for grounding
-        facts = _extract_numeric_facts(article_content)
-        facts_list = sorted(list(facts.get('raw_tokens', set())))
-        facts_block = "\n".join(facts_list[:40])
-        
-        # Extract mentioned products and brands
-        source_lower = article_content.lower()
-        mentioned_products = []
-        mentioned_brands = []
-        
-        # Brand detection patterns
-        brand_patterns = {
-            'xiaomi': ['xiaomi', 'mi ', 'redmi', 'poco'],
-            'samsung': ['samsung', 'galaxy'],
-            'apple': ['apple', 'iphone', 'ipad', 'mac'],
-            'vivo': ['vivo', 'iqoo'],
-            'oppo': ['oppo', 'oneplus'],
-            'huawei': ['huawei', 'honor'],
-            'realme': ['realme'],
-            'google': ['google', 'pixel'],
-            'sony': ['sony', 'xperia'],
-            'lg': ['lg'],
-            'motorola': ['motorola', 'moto']
+        return fn(*args)
+    finally:
+        _CALL_CONTEXT.deadline = previous
+        _CALL_CONTEXT.cancel = previous_cancel
+
+
+def _check_cancelled():
+    """Raise if this thread's LLM call was cancelled or its item deadline has passed."""
+    cancel = getattr(_CALL_CONTEXT, "cancel", None)
+    if cancel is not None and cancel.is_set():
+        raise LLMCallCancelled("LLM call cancelled")
+    if _deadline_expired():
+        raise DeadlineExceeded("item deadline exceeded")
+
+
+def _sleep_cancellable(seconds: float):
+    """Sleep up to `seconds`, cut short by this thread's cancel Event or item
+    deadline; raises like _check_cancelled() if either fired."""
+    deadline = _current_deadline()
+    if deadline is not None:
+        seconds = min(seconds, deadline.remaining())
+    cancel = getattr(_CALL_CONTEXT, "cancel", None)
+    if cancel is not None:
+        cancel.wait(max(0.0, seconds))
+    elif seconds > 0:
+        time.sleep(seconds)
+    _check_cancelled()
+
+
+# ---------------------------------------------------------------------------
+# Provider rate limiting (token buckets)
+# ---------------------------------------------------------------------------
+
+
+# Requests and tokens per minute allowed per provider; 0 (the default) means
+# unlimited, i.e. no client-side throttling beyond honouring Retry-After.
+try:
+    MIMO_RPM = int(os.environ.get("MIMO_RPM", "0"))
+except Exception:
+    MIMO_RPM = 0
+try:
+    MIMO_TPM = int(os.environ.get("MIMO_TPM", "0"))
+except Exception:
+    MIMO_TPM = 0
+try:
+    GEMINI_RPM = int(os.environ.get("GEMINI_RPM", "0"))
+except Exception:
+    GEMINI_RPM = 0
+try:
+    GEMINI_TPM = int(os.environ.get("GEMINI_TPM", "0"))
+except Exception:
+    GEMINI_TPM = 0
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap upper-bound token estimate: ~1 token per CJK char, ~1 per 3 ASCII chars."""
+    return len((text or "").encode("utf-8")) // 3 + 1
+
+
+class TokenBucketLimiter:
+    """Requests/min and tokens/min buckets for one provider, shared by all threads.
+
+    acquire() blocks until both buckets can pay for the call; defer() honours a
+    server Retry-After by pausing every caller of this provider, not just the
+    thread that saw the 429.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int):
+        self.name = name
+        self.rpm = max(0, int(rpm))
+        self.tpm = max(0, int(tpm))
+        self._requests = float(self.rpm)
+        self._tokens = float(self.tpm)
+        self._stamp = time.monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        elapsed = now - self._stamp
+        self._stamp = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens: int = 0):
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        interruptible = getattr(_CALL_CONTEXT, "cancel", None) is not None or _current_deadline() is not None
+        with self._cond:
+            while True:
+                _check_cancelled()
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    wait_req = (1 - self._requests) * 60.0 / self.rpm if self.rpm and self._requests < 1 else 0
+                    wait_tok = (tokens - self._tokens) * 60.0 / self.tpm if self.tpm and self._tokens < tokens else 0
+                    wait = max(wait_req, wait_tok)
+                    if wait <= 0:
+                        if self.rpm:
+                            self._requests -= 1
+                        if self.tpm:
+                            self._tokens -= tokens
+                        return
+                if wait > 1:
+                    print(f"  ⏳ {self.name} rate limiter: waiting {wait:.1f}s")
+                self._cond.wait(min(wait, 0.5) if interruptible else wait)
+
+    def defer(self, seconds: float):
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + max(0.0, seconds))
+            self._cond.notify_all()
+
+
+RATE_LIMITERS = {
+    "mimo": TokenBucketLimiter("MiMo", MIMO_RPM, MIMO_TPM),
+    "gemini": TokenBucketLimiter("Gemini", GEMINI_RPM, GEMINI_TPM),
+}
+
+_GEMINI_RETRY_RE = re.compile(r"retry(?:_delay)?[^0-9]{0,24}(\d+(?:\.\d+)?)", re.I)
+
+
+def _gemini_retry_after(exc) -> float:
+    """Seconds to back off after a Gemini quota error (0 if it was not one)."""
+    msg = str(exc)
+    if "429" not in msg and "ResourceExhausted" not in type(exc).__name__ and "quota" not in msg.lower():
+        return 0.0
+    m = _GEMINI_RETRY_RE.search(msg)
+    return float(m.group(1)) if m else 30.0
+
+
+# ---------------------------------------------------------------------------
+# Provider circuit breakers
+# ---------------------------------------------------------------------------
+
+# A provider with LLM_BREAKER_FAILURES bad calls (errors, or slower than
+# LLM_BREAKER_SLOW_SEC) among its last LLM_BREAKER_WINDOW calls is skipped for
+# LLM_BREAKER_COOLDOWN_SEC, then a single probe call decides whether it is back.
+try:
+    LLM_BREAKER_WINDOW = int(os.environ.get("LLM_BREAKER_WINDOW", "5"))
+except Exception:
+    LLM_BREAKER_WINDOW = 5
+try:
+    LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "3"))
+except Exception:
+    LLM_BREAKER_FAILURES = 3
+try:
+    LLM_BREAKER_COOLDOWN_SEC = float(os.environ.get("LLM_BREAKER_COOLDOWN_SEC", "300"))
+except Exception:
+    LLM_BREAKER_COOLDOWN_SEC = 300.0
+try:
+    LLM_BREAKER_SLOW_SEC = float(os.environ.get("LLM_BREAKER_SLOW_SEC", "30"))
+except Exception:
+    LLM_BREAKER_SLOW_SEC = 30.0
+
+
+class CircuitBreaker:
+    """closed -> open after too many recent failures -> half_open after the
+    cooldown (one probe call allowed) -> closed on success / open on failure."""
+
+    def __init__(self, name, window=LLM_BREAKER_WINDOW, failures=LLM_BREAKER_FAILURES,
+                 cooldown_sec=LLM_BREAKER_COOLDOWN_SEC, slow_sec=LLM_BREAKER_SLOW_SEC):
+        self.name = name
+        self.failures = max(1, int(failures))
+        self.cooldown_sec = float(cooldown_sec)
+        self.slow_sec = float(slow_sec)
+        self.state = "closed"
+        self._recent = deque(maxlen=max(self.failures, int(window)))
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Would allow() admit a call now? Unlike allow() it does not take the probe slot."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "closed":
+                return True
+            if self.state == "open" and now - self._opened_at < self.cooldown_sec:
+                return False
+            return not (self._probe_started and now - self._probe_started < self.cooldown_sec)
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if now - self._opened_at < self.cooldown_sec:
+                    return False
+                self.state = "half_open"
+                print(f"  🔌 {self.name} circuit half-open: sending a probe request")
+            # half_open: one probe at a time (a probe that never reports back expires)
+            if self._probe_started and now - self._probe_started < self.cooldown_sec:
+                return False
+            self._probe_started = now
+            return True
+
+    def release(self):
+        """Hand back a probe slot whose call never got an answer (cancelled / timed out by us)."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_started = 0.0
+
+    def record(self, ok: bool, latency: float = 0.0):
+        ok = ok and latency <= self.slow_sec
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_started = 0.0
+                if ok:
+                    print(f"  🔌 {self.name} circuit closed: probe succeeded")
+                    self.state = "closed"
+                    self._recent.clear()
+                else:
+                    self._trip()
+                return
+            self._recent.append(ok)
+            if self.state == "closed" and sum(1 for x in self._recent if not x) >= self.failures:
+                self._trip()
+
+    def _trip(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._recent.clear()
+        print(f"  🔌 {self.name} circuit open: skipping it for {self.cooldown_sec:.0f}s")
+
+
+BREAKERS = {"mimo": CircuitBreaker("MiMo"), "gemini": CircuitBreaker("Gemini")}
+
+
+class CircuitOpenError(Exception):
+    """A provider call refused by its circuit breaker before anything was sent."""
+
+
+def _routable_providers():
+    """(use_mimo, use_gemini) after consulting the breakers; if every configured
+    provider is open, fall back to trying them anyway rather than not at all.
+
+    This only peeks at the breakers: the half-open probe slot is taken by
+    _claim_breaker() when a call is actually made, so routing to a provider
+    that ends up unused (MiMo answered first) does not strand its probe."""
+    use_mimo = MIMO_AVAILABLE and BREAKERS["mimo"].available()
+    use_gemini = GEMINI_AVAILABLE and BREAKERS["gemini"].available()
+    if not use_mimo and not use_gemini:
+        return MIMO_AVAILABLE, GEMINI_AVAILABLE
+    return use_mimo, use_gemini
+
+
+def _claim_breaker(name):
+    """Take `name`'s breaker go-ahead right before calling it; raises CircuitOpenError
+    if it is open, unless no configured provider is routable (then try anyway)."""
+    if BREAKERS[name].allow():
+        return
+    if (MIMO_AVAILABLE and BREAKERS["mimo"].available()) or (GEMINI_AVAILABLE and BREAKERS["gemini"].available()):
+        raise CircuitOpenError(f"{BREAKERS[name].name} circuit open")
+
+
+# ---------------------------------------------------------------------------
+# LLM call telemetry
+# ---------------------------------------------------------------------------
+
+# Every provider call (not cache hits) is recorded per provider and prompt
+# type: wall time including retry waits, retries, last HTTP status, prompt /
+# completion tokens (from the provider's usage block, else estimated) and the
+# outcome. A summary is logged after each cycle and the snapshot is written
+# as JSON to LLM_TELEMETRY_PATH (empty disables the export).
+LLM_TELEMETRY_FILE = os.environ.get("LLM_TELEMETRY_PATH", "logs/llm_telemetry.json").strip()
+try:
+    LLM_TELEMETRY_WINDOW = int(os.environ.get("LLM_TELEMETRY_WINDOW", "200"))
+except Exception:
+    LLM_TELEMETRY_WINDOW = 200
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open.
+_LATENCY_BUCKETS = (0.5, 1, 2, 4, 8, 15, 30, 60)
+
+LLMCall = namedtuple("LLMCall", "ts latency outcome status retries prompt_tokens completion_tokens")
+
+
+@contextmanager
+def _llm_prompt_kind(kind: str):
+    """Tag the LLM calls made in this thread with a prompt type for telemetry."""
+    previous = getattr(_CALL_CONTEXT, "prompt_kind", None)
+    _CALL_CONTEXT.prompt_kind = kind
+    try:
+        yield
+    finally:
+        _CALL_CONTEXT.prompt_kind = previous
+
+
+def _current_prompt_kind() -> str:
+    return getattr(_CALL_CONTEXT, "prompt_kind", None) or "summary"
+
+
+def _call_outcome(exc) -> str:
+    if isinstance(exc, MalformedStreamError):
+        return "malformed"
+    if isinstance(exc, DeadlineExceeded):
+        return "deadline"
+    if isinstance(exc, LLMCallCancelled):
+        return "cancelled"
+    if isinstance(exc, requests.exceptions.Timeout) or "timeout" in type(exc).__name__.lower():
+        return "timeout"
+    return "error"
+
+
+def _percentile(sorted_values, q: float):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class LLMTelemetry:
+    """Rolling window of LLMCall records per (provider, prompt type)."""
+
+    def __init__(self, window=LLM_TELEMETRY_WINDOW):
+        self.window = max(10, int(window))
+        self._calls = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, kind: str, latency: float, outcome: str, status=None,
+               retries: int = 0, prompt_tokens: int = 0, completion_tokens: int = 0):
+        call = LLMCall(time.time(), round(latency, 3), outcome, status, retries, prompt_tokens, completion_tokens)
+        with self._lock:
+            self._calls.setdefault((provider, kind), deque(maxlen=self.window)).append(call)
+            self._totals[(provider, kind)] = self._totals.get((provider, kind), 0) + 1
+
+    def latencies(self, provider: str, kind=None):
+        """Sorted wall times of successful calls in the window (all prompt types if kind is None)."""
+        with self._lock:
+            calls = [c for (p, k), dq in self._calls.items() if p == provider and kind in (None, k) for c in dq]
+        return sorted(c.latency for c in calls if c.outcome == "ok")
+
+    def percentile(self, provider: str, q: float, kind=None, min_samples: int = 1):
+        values = self.latencies(provider, kind)
+        return _percentile(values, q) if len(values) >= min_samples else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = [(key, list(dq), self._totals.get(key, 0)) for key, dq in self._calls.items()]
+        providers = {}
+        for (provider, kind), calls, total in sorted(items):
+            ok = sorted(c.latency for c in calls if c.outcome == "ok")
+            outcomes, statuses = {}, {}
+            for c in calls:
+                outcomes[c.outcome] = outcomes.get(c.outcome, 0) + 1
+                if c.status is not None:
+                    statuses[str(c.status)] = statuses.get(str(c.status), 0) + 1
+            histogram = {f"le_{b}": 0 for b in _LATENCY_BUCKETS}
+            histogram["gt_" + str(_LATENCY_BUCKETS[-1])] = 0
+            for c in calls:
+                b = next((b for b in _LATENCY_BUCKETS if c.latency <= b), None)
+                histogram[f"le_{b}" if b is not None else "gt_" + str(_LATENCY_BUCKETS[-1])] += 1
+            providers.setdefault(provider, {})[kind] = {
+                "total_calls": total,
+                "window_calls": len(calls),
+                "outcomes": outcomes,
+                "http_status": statuses,
+                "retries": sum(c.retries for c in calls),
+                "latency_p50": _percentile(ok, 0.50),
+                "latency_p95": _percentile(ok, 0.95),
+                "latency_max": ok[-1] if ok else None,
+                "latency_histogram": histogram,
+                "prompt_tokens_avg": round(sum(c.prompt_tokens for c in calls) / len(calls)) if calls else 0,
+                "completion_tokens_avg": round(sum(c.completion_tokens for c in calls) / len(calls)) if calls else 0,
+            }
+        return {"ts": time.time(), "window": self.window, "providers": providers}
+
+    def log_summary(self):
+        snap = self.snapshot()
+        for provider, kinds in snap["providers"].items():
+            for kind, s in kinds.items():
+                outcomes = ", ".join(f"{k} {v}" for k, v in sorted(s["outcomes"].items()))
+                p50 = f"{s['latency_p50']:.1f}s" if s["latency_p50"] is not None else "-"
+                p95 = f"{s['latency_p95']:.1f}s" if s["latency_p95"] is not None else "-"
+                print(
+                    f"📈 LLM {provider}/{kind}: {s['window_calls']} calls ({outcomes}), "
+                    f"p50 {p50} p95 {p95}, retries {s['retries']}, "
+                    f"tokens ~{s['prompt_tokens_avg']}→{s['completion_tokens_avg']}"
+                )
+        return snap
+
+    def export(self, path=LLM_TELEMETRY_FILE, snap=None):
+        if not path:
+            return
+        snap = dict(snap or self.snapshot())
+        with _HEDGE_STATS_LOCK:
+            snap["hedge"] = dict(HEDGE_STATS)
+        snap["cache"] = {"hits": LLM_CACHE.hits, "misses": LLM_CACHE.misses}
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snap, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"⚠️  Could not write LLM telemetry: {e}")
+
+
+LLM_TELEMETRY = LLMTelemetry()
+
+
+# ---------------------------------------------------------------------------
+# LLM transport + persistent response cache
+# ---------------------------------------------------------------------------
+
+# Completed LLM responses keyed by provider, model, parameters and prompt hash.
+# A retried item or the same article arriving via two feeds is answered from
+# disk instead of paying for an identical MiMo/Gemini call. TTL 0 disables it.
+LLM_CACHE_FILE = os.environ.get("LLM_CACHE_PATH", "logs/llm_cache.jsonl").strip() or "logs/llm_cache.jsonl"
+try:
+    LLM_CACHE_TTL_HOURS = float(os.environ.get("LLM_CACHE_TTL_HOURS", "72"))
+except Exception:
+    LLM_CACHE_TTL_HOURS = 72.0
+try:
+    LLM_CACHE_MAX_ITEMS = int(os.environ.get("LLM_CACHE_MAX_ITEMS", "2000"))
+except Exception:
+    LLM_CACHE_MAX_ITEMS = 2000
+
+
+def _llm_cache_key(provider: str, model: str, params: dict, prompt: str) -> str:
+    """Stable key; whitespace-only prompt differences map to the same entry."""
+    normalized = " ".join((prompt or "").split())
+    prompt_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return json.dumps([provider, model, sorted((params or {}).items()), prompt_hash],
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+class LLMResponseCache:
+    """Append-only JSONL cache of LLM response texts with TTL and LRU bound.
+
+    Entries are kept in an insertion-ordered dict (hits move to the end) and
+    the oldest are evicted past max_items. The file is rewritten only when it
+    has grown to twice the live entry count.
+    """
+
+    def __init__(self, path=LLM_CACHE_FILE, ttl_sec=LLM_CACHE_TTL_HOURS * 3600, max_items=LLM_CACHE_MAX_ITEMS):
+        self.path = path
+        self.ttl_sec = float(ttl_sec)
+        self.max_items = max(0, int(max_items))
+        self.enabled = self.ttl_sec > 0 and self.max_items > 0
+        self._entries = {}
+        self._file_lines = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            self._load()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl_sec
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._file_lines += 1
+                    try:
+                        rec = json.loads(line)
+                        if rec["ts"] >= cutoff:
+                            self._entries.pop(rec["key"], None)
+                            self._entries[rec["key"]] = (rec["ts"], rec["text"])
+                    except Exception:
+                        continue
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️  Could not load LLM cache: {e}")
+            return
+        self._evict()
+        if self._entries:
+            print(f"📦 Loaded {len(self._entries)} cached LLM responses")
+
+    def _evict(self):
+        while len(self._entries) > self.max_items:
+            del self._entries[next(iter(self._entries))]
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl_sec:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            # Refresh recency
+            del self._entries[key]
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, text: str):
+        if not self.enabled or not text:
+            return
+        ts = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (ts, text)
+            self._evict()
+            try:
+                if self._file_lines >= 2 * max(self.max_items, 1):
+                    self._rewrite()
+                else:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"key": key, "ts": ts, "text": text}, ensure_ascii=False) + "\n")
+                    self._file_lines += 1
+            except Exception as e:
+                print(f"⚠️  Could not persist LLM cache entry: {e}")
+
+    def _rewrite(self):
+        tmp = self.path + ".tmp"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key, (ts, text) in self._entries.items():
+                f.write(json.dumps({"key": key, "ts": ts, "text": text}, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        self._file_lines = len(self._entries)
+
+
+LLM_CACHE = LLMResponseCache()
+
+
+# Concurrent summarization workers; provider rate limits are enforced by
+# RATE_LIMITERS, so this only bounds in-flight fetches and LLM calls.
+try:
+    SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", "3"))
+except Exception:
+    SUMMARY_WORKERS = 3
+
+# Per-provider request timeouts (seconds). MiMo keeps the (connect, read) tuple
+# form used by the other HTTP calls in this file.
+try:
+    MIMO_TIMEOUT_SEC = float(os.environ.get("MIMO_TIMEOUT_SEC", "15"))
+except Exception:
+    MIMO_TIMEOUT_SEC = 15.0
+try:
+    GEMINI_TIMEOUT_SEC = float(os.environ.get("GEMINI_TIMEOUT_SEC", "60"))
+except Exception:
+    GEMINI_TIMEOUT_SEC = 60.0
+
+# Stream MiMo completions that have a stop rule (title-only regeneration and
+# summaries) so reading ends as soon as the parser has what it needs, or as
+# soon as the reply has clearly gone off format. Servers that ignore
+# "stream" are read as a normal JSON reply.
+LLM_STREAM = os.environ.get("LLM_STREAM", "1") == "1"
+
+
+class MalformedStreamError(Exception):
+    """A streamed completion was abandoned because it went off format."""
+
+
+class MimoClient:
+    """Long-lived MiMo (OpenAI-compatible) client.
+
+    One pooled requests.Session with the auth headers set once; the endpoint,
+    model and timeout are fixed at startup. Every MiMo call goes through
+    complete(), which is also where it is recorded in LLM_TELEMETRY.
+    """
+
+    def __init__(self, api_base, api_key, model, timeout):
+        self.url = f"{api_base.rstrip('/')}/chat/completions"
+        self.model = model
+        self.timeout = (TIMEOUT[0], timeout)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=max(4, 2 * SUMMARY_WORKERS))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def post(self, payload):
+        return self.session.post(self.url, json=payload, timeout=_stage_timeout(self.timeout),
+                                 stream=bool(payload.get("stream")))
+
+    @staticmethod
+    def _read_stream(r, until):
+        """Accumulate an SSE chat completion, stopping once until(text) returns
+        "done"; raises MalformedStreamError once it returns "abort"."""
+        text, usage = "", {}
+        try:
+            for raw in r.iter_lines():
+                _check_cancelled()
+                if not raw.startswith(b"data:"):
+                    continue
+                data = raw[5:].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get("usage") or usage
+                delta = "".join((c.get("delta") or {}).get("content") or "" for c in chunk.get("choices") or ())
+                if not delta:
+                    continue
+                text += delta
+                verdict = until(text)
+                if verdict == "abort":
+                    raise MalformedStreamError(f"MiMo stream went off format after {len(text)} characters")
+                if verdict == "done":
+                    print(f"  ✂️  MiMo stream stopped early after {len(text)} characters")
+                    break
+        finally:
+            r.close()
+        return text.strip(), usage
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int, until=None) -> str:
+        """One completion; with a stop rule `until` (and LLM_STREAM) it is streamed."""
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
         }
-        
-        # Detect mentioned brands
-        for brand, patterns in brand_patterns.items():
-            if any(pattern in source_lower for pattern in patterns):
-                mentioned_brands.append(brand.title())
-        
-        # Look for model numbers
-        import re
-        model_patterns = [
-            r'\b[a-z]+\s*\d{2,4}[a-z]*\b',  # Like "X300", "Y28", "15T"
-            r'\b[a-z]+\s*[a-z]+\s*\d+[a-z]*\b',  # Like "iPhone 15", "Redmi Note 12"
-        ]
-        
-        for pattern in model_patterns:
-            matches = re.findall(pattern, source_lower)
-            for match in matches:
-                if len(match) > 3:
-                    mentioned_products.append(match.title())
-        
-        products_context = f"Products mentioned in source: {', '.join(mentioned_products)}" if mentioned_products else "No specific products mentioned"
-        brands_context = f"Brands mentioned in source: {', '.join(mentioned_brands)}" if mentioned_brands else "No specific brands mentioned"
-        
-        # Create Gemini prompt (aligned with MiMo summary length and style)
-        prompt = f"""请阅读以下新闻文章并提供：
+        streaming = LLM_STREAM and until is not None
+        if streaming:
+            payload["stream"] = True
+        _claim_breaker("mimo")
+        kind = _current_prompt_kind()
+        stats = {"retries": 0, "status": None}
+        started = time.monotonic()
+        try:
+            r = _mimo_api_request_with_retry(payload, stats=stats)
+            if streaming and "text/event-stream" in r.headers.get("Content-Type", ""):
+                content, usage = self._read_stream(r, until)
+                if not content:
+                    raise Exception("Empty stream from MiMo API")
+            else:
+                data = r.json()
+                if "choices" not in data or not data["choices"]:
+                    raise Exception("Empty or invalid response from MiMo API")
+                content = (data["choices"][0]["message"]["content"] or "").strip()
+                usage = data.get("usage") or {}
+        except Exception as e:
+            latency = time.monotonic() - started
+            # A cancellation or a timeout we imposed is not the provider's fault
+            if not isinstance(e, LLMCallCancelled) and not _deadline_expired():
+                BREAKERS["mimo"].record(False, latency)
+            else:
+                BREAKERS["mimo"].release()
+            LLM_TELEMETRY.record("mimo", kind, latency, _call_outcome(e), stats["status"], stats["retries"],
+                                 _estimate_tokens(prompt))
+            raise
+        latency = time.monotonic() - started
+        LLM_TELEMETRY.record("mimo", kind, latency, "ok", stats["status"], stats["retries"],
+                             int(usage.get("prompt_tokens") or _estimate_tokens(prompt)),
+                             int(usage.get("completion_tokens") or _estimate_tokens(content)))
+        BREAKERS["mimo"].record(True, latency)
+        return content
 
-1. **中文标题（带分类标签）** - 格式：【分类】中文标题
-2. **中文摘要** - 不超过100字，用2-3句完整的话总结新闻的关键信息（时间、地点、主体、关键数字和影响）
 
-要求：
+class GeminiClient:
+    """Long-lived Gemini client: the GenerativeModel is built once (lazily) and reused."""
+
+    def __init__(self, model_name, timeout):
+        self.model_name = model_name
+        self.timeout = timeout
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def complete(self, prompt: str) -> str:
+        _claim_breaker("gemini")
+        try:
+            RATE_LIMITERS["gemini"].acquire(_estimate_tokens(prompt))
+            _check_cancelled()
+        except LLMCallCancelled:
+            BREAKERS["gemini"].release()
+            raise
+        kind = _current_prompt_kind()
+        started = time.monotonic()
+        try:
+            response = self.model.generate_content(prompt, request_options={"timeout": _stage_timeout(self.timeout)})
+            if not response.text:
+                raise Exception("Empty response from Gemini")
+        except Exception as e:
+            latency = time.monotonic() - started
+            if not _deadline_expired():
+                BREAKERS["gemini"].record(False, latency)
+            else:
+                BREAKERS["gemini"].release()
+            status = getattr(e, "code", None)
+            LLM_TELEMETRY.record("gemini", kind, latency, _call_outcome(e), status if isinstance(status, int) else None,
+                                 0, _estimate_tokens(prompt))
+            retry_after = _gemini_retry_after(e)
+            if retry_after:
+                print(f"  ⏳ Gemini quota exceeded; pausing Gemini calls for {retry_after:.0f}s")
+                RATE_LIMITERS["gemini"].defer(retry_after)
+            raise
+        latency = time.monotonic() - started
+        text = response.text.strip()
+        usage = getattr(response, "usage_metadata", None)
+        LLM_TELEMETRY.record("gemini", kind, latency, "ok", 200, 0,
+                             int(getattr(usage, "prompt_token_count", 0) or _estimate_tokens(prompt)),
+                             int(getattr(usage, "candidates_token_count", 0) or _estimate_tokens(text)))
+        BREAKERS["gemini"].record(True, latency)
+        return text
+
+
+MIMO_CLIENT = MimoClient(MIMO_API_BASE, MIMO_API_KEY, MIMO_MODEL, MIMO_TIMEOUT_SEC)
+GEMINI_CLIENT = GeminiClient(GEMINI_MODEL, GEMINI_TIMEOUT_SEC)
+
+
+def _mimo_chat_completion(prompt: str, temperature: float, max_tokens: int, until=None, accept=None) -> str:
+    """One MiMo chat completion (with 429 retry), served from LLM_CACHE when possible.
+
+    until is an optional stream stop rule (see _title_stream_check). The reply
+    is cached only if accept(reply) passes the caller's validation, so an
+    English, placeholder or unparsable reply is asked for again next time.
+    """
+    key = _llm_cache_key("mimo", MIMO_CLIENT.model, {"temperature": temperature, "max_tokens": max_tokens}, prompt)
+    cached = LLM_CACHE.get(key)
+    if cached is not None:
+        print(f"  ♻️  MiMo response served from cache ({len(cached)} characters)")
+        return cached
+    content = MIMO_CLIENT.complete(prompt, temperature, max_tokens, until=until)
+    if accept is not None and accept(content):
+        LLM_CACHE.put(key, content)
+    return content
+
+
+def _gemini_generate_text(prompt: str, accept=None) -> str:
+    """One Gemini generate_content call, served from LLM_CACHE when possible
+    (cached only if accept(reply) passes, as for MiMo)."""
+    key = _llm_cache_key("gemini", GEMINI_CLIENT.model_name, {}, prompt)
+    cached = LLM_CACHE.get(key)
+    if cached is not None:
+        print(f"  ♻️  Gemini response served from cache ({len(cached)} characters)")
+        return cached
+    content = GEMINI_CLIENT.complete(prompt)
+    if accept is not None and accept(content):
+        LLM_CACHE.put(key, content)
+    return content
+
+
+# ---------------------------------------------------------------------------
+# Summary prompt, structured output parsing and targeted repair
+# ---------------------------------------------------------------------------
+
+# Ask for one JSON object (title, category, summary, language) instead of
+# free-form 标题:/摘要: lines; the parser still accepts the legacy format.
+LLM_JSON_OUTPUT = os.environ.get("LLM_JSON_OUTPUT", "1") == "1"
+
+ALLOWED_LLM_CATEGORIES = ("科技", "娱乐", "经济", "体育", "灾难", "政治", "综合")
+_PLACEHOLDER_TITLES = {"【分类】中文标题", "中文标题", ""}
+_PLACEHOLDER_SUMMARIES = {"中文摘要", "摘要", ""}
+
+_SUMMARY_RULES = f"""要求：
 - 标题和摘要必须用简体中文（不要使用繁体中文）
-- 分类选项：科技、娱乐、经济、体育、灾难、政治、综合
+- 分类选项：{'、'.join(ALLOWED_LLM_CATEGORIES)}
 - 人名、品牌名、产品名、地名保持原文（英文/马来文），不要翻译成中文（如Nabil Halimi、PKR、Malaysiakini等应保持原样）
 - 只使用文章中明确提到的数字和事实
 - 不要添加文章中未提及的产品或信息
 - 摘要不能只是简单改写标题，必须补充标题中没有的细节（如具体机型、价格、合作方、时间等）
 - 保持专业、清晰的表达
-- **重要：请仔细阅读文章内容，不要只基于标题生成摘要**
+- **重要：请仔细阅读文章内容，不要只基于标题生成摘要**"""
 
-文章标题: {title}
-文章内容: {article_content[:5000]}...
+_JSON_REPLY_FORMAT = """请只输出一个JSON对象，不要其它文字：
+{"title": "简体中文标题（不含【】分类标签）", "category": "分类", "summary": "中文摘要", "language": "zh"}"""
+
+_LINES_REPLY_FORMAT = """请按以下格式回复：
+标题: 【分类】中文标题
+摘要: 中文摘要"""
 
-来源信息:
-{products_context}
-{brands_context}
 
+def _build_summary_prompt(title, article_content, facts_block, read=False, context=""):
+    """Single-article summary prompt shared by the MiMo and Gemini summarizers."""
+    context_block = f"\n来源信息:\n{context}\n" if context.strip() else ""
+    return f"""请{'阅读' if read else '分析'}以下新闻文章并提供：
+
+1. **中文标题（带分类标签）** - 格式：【分类】中文标题
+2. **中文摘要** - 不超过100字，用2-3句完整的话总结新闻的关键信息（时间、地点、主体、关键数字和影响）
+
+{_SUMMARY_RULES}
+
+文章标题: {title}
+
+文章内容:
+{article_content}
+{context_block}
 提取的事实: {facts_block}
 
-请按以下格式回复：
-标题: 【分类】中文标题
-摘要: 中文摘要"""
+{_JSON_REPLY_FORMAT if LLM_JSON_OUTPUT else _LINES_REPLY_FORMAT}"""
+
+
+def _parse_summary_lines(content: str):
+    """Legacy 标题:/摘要: line parser; returns (chinese_title, summary), possibly empty."""
+    chinese_title = ""
+    summary = ""
+    for line in (content or "").split('\n'):
+        line = line.strip()
+        if line.startswith('标题:'):
+            chinese_title = line.replace('标题:', '').strip()
+        elif line.startswith('摘要:'):
+            summary = line.replace('摘要:', '').strip()
+        elif not chinese_title and line and not line.startswith('摘要:'):
+            # If no title found yet, this might be the title
+            chinese_title = line
+        elif chinese_title and line and not line.startswith('标题:'):
+            # If we have a title, this is part of the summary
+            if summary:
+                summary += " " + line
+            else:
+                summary = line
+    return chinese_title, summary
+
+
+# classify() labels that the LLM prompt names differently.
+_CLASSIFIER_TO_LLM_CATEGORY = {"灾害": "灾难", "文娱": "娱乐"}
+
+
+def _llm_category(title: str, summary: str) -> str:
+    """Keyword-classifier category expressed in ALLOWED_LLM_CATEGORIES."""
+    category = classify(title, summary)
+    return _CLASSIFIER_TO_LLM_CATEGORY.get(category, category)
+
+
+def _parse_summary_response(content: str):
+    """Parse a JSON summary object if present, else fall back to the line format.
+
+    The category is validated locally; a missing or unknown one is replaced by
+    the keyword classifier's pick (in the LLM vocabulary, see _llm_category)
+    instead of spending a repair call, so the title always carries a 【】 tag.
+    """
+    data = None
+    if "{" in (content or ""):
+        try:
+            data = _extract_json_payload(content, "{", "}")
+        except Exception:
+            data = None
+    if not isinstance(data, dict):
+        return _parse_summary_lines(content)
+    title = str(data.get("title") or "").strip()
+    summary = str(data.get("summary") or "").strip()
+    category = str(data.get("category") or "").strip().strip("【】")
+    headline = _extract_title_headline_for_lang_check(title)
+    if headline:
+        if category not in ALLOWED_LLM_CATEGORIES:
+            category = _llm_category(headline, summary)
+        title = f"【{category}】{headline}"
+    language = str(data.get("language") or "zh").strip().lower()
+    if not language.startswith("zh") and text_profile(summary).cjk == 0:
+        summary = ""
+    return title, summary
+
+
+# Streamed replies: lines of preamble tolerated before a title line, and
+# characters tolerated without any expected marker, before aborting.
+_STREAM_PREAMBLE_LINES = 2
+_STREAM_MAX_UNMARKED_CHARS = 400
+
+
+def _complete_stream_lines(text: str):
+    """Non-empty lines of a partial reply that are already terminated by a newline."""
+    return [line.strip() for line in text.split("\n")[:-1] if line.strip()]
+
+
+def _summary_stream_check(text: str):
+    """Stream stop rule for summary replies.
+
+    A JSON reply is done once the object parses with a summary; the line
+    format can continue the summary over several lines, so it is read to the
+    end. Abort when no expected marker shows up or the reply drifts into English.
+    """
+    if "}" in text:
+        try:
+            data = _extract_json_payload(text, "{", "}")
+            if isinstance(data, dict) and data.get("summary"):
+                return "done"
+        except Exception:
+            pass
+    if "{" in text:
+        return None
+    if len(text) > _STREAM_MAX_UNMARKED_CHARS and "标题" not in text and "摘要" not in text:
+        return "abort"
+    if len(text) > _STREAM_MAX_UNMARKED_CHARS // 2 and text_profile(text).is_mostly_english:
+        return "abort"
+    return None
+
+
+def _provider_complete(provider: str, prompt: str, temperature: float, max_tokens: int, accept=None) -> str:
+    if provider == "mimo":
+        return _mimo_chat_completion(prompt, temperature=temperature, max_tokens=max_tokens, accept=accept)
+    return _gemini_generate_text(prompt, accept=accept)
+
+
+# Cache predicates: a reply is only stored in LLM_CACHE once it passes the
+# same validation its caller applies.
+def _accept_summary_reply(title: str):
+    def accept(content: str) -> bool:
+        chinese_title, summary = _parse_summary_response(content)
+        return (
+            bool(chinese_title and summary)
+            and _is_valid_ai_result(title, chinese_title, summary)
+            and not _title_headline_is_mostly_english(chinese_title)
+        )
+    return accept
+
+
+def _accept_repair_reply(content: str) -> bool:
+    summary = _parse_summary_lines(content)[1] if "摘要:" in content else content.strip()
+    return summary not in _PLACEHOLDER_SUMMARIES and not text_profile(summary).is_mostly_english
+
+
+def _accept_title_reply(content: str) -> bool:
+    title = _parse_title_only_from_llm_response(content)
+    return title not in _PLACEHOLDER_TITLES and not _title_headline_is_mostly_english(title)
+
+
+def _accept_batch_reply(titles):
+    def accept(content: str) -> bool:
+        try:
+            parsed = _extract_json_payload(content)
+        except Exception:
+            return False
+        if not isinstance(parsed, list):
+            return False
+        valid = set()
+        for entry in parsed:
+            ok = _validate_batch_entry(entry, titles)
+            if ok:
+                valid.add(ok[0])
+        return len(valid) == len(titles)
+    return accept
+
+
+def _repair_summary_fields(provider, chinese_title, summary, article_content):
+    """Targeted repair: a short call for the summary and/or title only if it failed validation."""
+    if not LLM_JSON_OUTPUT:
+        return chinese_title, summary
+    if (summary or "").strip() in _PLACEHOLDER_SUMMARIES or text_profile(summary).is_mostly_english:
+        try:
+            print(f"  🩹 Summary failed validation; repairing summary only via {provider}")
+            prompt = f"""请用简体中文为下面这篇新闻写一段摘要（不超过100字，2-3句完整的话，包含关键数字和事实；人名、品牌、地名可保留原文）。
+只输出一行，格式：摘要: 中文摘要
+
+文章标题: {chinese_title}
+
+文章内容:
+{budget_article_text(article_content, PROMPT_EXCERPT_TOKEN_BUDGET, chinese_title)}"""
+            with _llm_prompt_kind("repair"):
+                raw = _provider_complete(provider, prompt, 0.3, 512, accept=_accept_repair_reply)
+            repaired = _parse_summary_lines(raw)[1] if "摘要:" in raw else raw.strip()
+            if repaired and not text_profile(repaired).is_mostly_english:
+                summary = repaired
+        except Exception as e:
+            print(f"  ⚠️  Summary repair failed: {e}")
+    if summary and (not (chinese_title or "").strip() or _title_headline_is_mostly_english(chinese_title)):
+        try:
+            print(f"  🩹 Title failed validation; repairing title only via {provider}")
+            regen = mimo_regenerate_chinese_title_only if provider == "mimo" else gemini_regenerate_chinese_title_only
+            repaired = regen(chinese_title, summary, article_content)
+            if repaired and repaired not in _PLACEHOLDER_TITLES and not _title_headline_is_mostly_english(repaired):
+                chinese_title = repaired
+        except Exception as e:
+            print(f"  ⚠️  Title repair failed: {e}")
+    return chinese_title, summary
+
+
+def _ground_summary_numbers(provider, chinese_title, summary, source_text):
+    """Grounding gate: a summary quoting figures absent from the article gets at
+    most one targeted rewrite restricted to the article's own figures (only when
+    an LLM provider wrote it). Always returns a summary: if the rewrite fails
+    the original is kept and the mismatch is only logged."""
+    facts = _extract_numeric_facts(source_text)
+    if _numbers_consistent(summary, facts, source_text):
+        return summary
+    print(f"  ⚠️  Summary numbers not found in source: "
+          f"{', '.join(sorted(_unsupported_numbers(summary, facts, source_text)))}")
+    if provider not in ("mimo", "gemini") or _deadline_expired():
+        return summary
+
+    def accept(content):
+        repaired = _parse_summary_lines(content)[1] if "摘要:" in content else content.strip()
+        return _accept_repair_reply(content) and _numbers_consistent(repaired, facts, source_text)
+
+    try:
+        print(f"  🩹 Repairing summary numbers via {provider}")
+        prompt = f"""下面的中文摘要引用了原文中没有的数字。请改写摘要，只能使用“原文数字”列表中出现的数字，其余内容保持不变（不超过100字）。
+只输出一行，格式：摘要: 中文摘要
+
+文章标题: {chinese_title}
+
+原文数字:
+{_facts_block(source_text)}
+
+摘要: {summary}"""
+        with _llm_prompt_kind("repair"):
+            raw = _provider_complete(provider, prompt, 0.2, 512, accept=accept)
+        if accept(raw):
+            return _parse_summary_lines(raw)[1] if "摘要:" in raw else raw.strip()
+        print(f"  ⚠️  Summary number repair did not resolve the mismatch; keeping the original summary")
+    except Exception as e:
+        print(f"  ⚠️  Summary number repair failed, keeping the original summary: {e}")
+    return summary
 
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-2.5-flash')
+
+def gemini_summarize_from_url(title, article_url, article_content=None):
+    """Use Google Gemini AI to read and summarize the article directly from URL"""
+    if not GEMINI_AVAILABLE:
+        raise Exception("Gemini API not available")
+    
+    try:
+        print(f"  🤖 Gemini reading and summarizing: {title[:50]}...")
         
-        print(f"  📤 Sending request to Gemini API...")
-        response = model.generate_content(prompt)
+        # Read article content first (unless the caller already fetched it)
+        if article_content is None:
+            article_content = read_article_content(article_url)
+        if not article_content or len(article_content.strip()) < 50:
+            raise Exception("Failed to read article content or content too short")
         
-        if not response.text:
-            raise Exception("Empty response from Gemini")
+        # Extract facts for grounding
+        facts_block = _facts_block(article_content)
         
-        content = response.text.strip()
-        print(f"  📡 Gemini API response received: {len(content)} characters")
+        # Mentioned products and brands (shared, cached extractor)
+        products_context, brands_context = _entities_prompt_context(extract_entities(article_content))
         
-        # Parse the response
-        lines = content.split('\n')
-        chinese_title = ""
-        summary = ""
+        # Create Gemini prompt (aligned with MiMo summary length and style)
+        prompt = _build_summary_prompt(
+            title, budget_article_text(article_content, title=title), facts_block, read=True,
+            context=f"{products_context}\n{brands_context}",
+        )
+
+        print(f"  📤 Sending request to Gemini API...")
+        content = _gemini_generate_text(prompt, accept=_accept_summary_reply(title))
+        print(f"  📡 Gemini API response received: {len(content)} characters")
         
-        for line in lines:
-            line = line.strip()
-            if line.startswith('标题:'):
-                chinese_title = line.replace('标题:', '').strip()
-            elif line.startswith('摘要:'):
-                summary = line.replace('摘要:', '').strip()
-            elif not chinese_title and line and not line.startswith('摘要:'):
-                chinese_title = line
-            elif chinese_title and line and not line.startswith('标题:'):
-                if summary:
-                    summary += " " + line
-                else:
-                    summary = line
+        # Parse JSON (or legacy 标题:/摘要: lines), then repair only a failed field
+        chinese_title, summary = _parse_summary_response(content)
+        chinese_title, summary = _repair_summary_fields("gemini", chinese_title, summary, article_content)
         
         # Fallback if parsing failed
         if not chinese_title or not summary:
@@ -1395,6 +3446,8 @@ def gemini_summarize_from_url(title, article_url):
         
     except Exception as e:
         print(f"  ❌ Gemini summarization failed: {e}")
+        if not (article_content or "").strip():
+            raise  # nothing to truncate: let the caller fall back
         # Fallback to simple truncation
         return f"【科技】{title}", (article_content[:500] + "..." if len(article_content) > 500 else article_content)
 
@@ -1407,70 +3460,19 @@ def gemini_summarize_content(title, article_content):
         print(f"  🤖 Gemini summarizing content: {title[:50]}...")
         
         # Extract facts for grounding
-        facts = _extract_numeric_facts(article_content)
-        facts_list = sorted(list(facts.get('raw_tokens', set())))
-        facts_block = "\n".join(facts_list[:40])
+        facts_block = _facts_block(article_content)
         
         # Create Gemini prompt (aligned with MiMo summary length and style)
-        prompt = f"""请分析以下新闻文章并提供：
-
-1. **中文标题（带分类标签）** - 格式：【分类】中文标题
-2. **中文摘要** - 不超过100字，用2-3句完整的话总结新闻的关键信息（时间、地点、主体、关键数字和影响）
-
-要求：
-- 标题和摘要必须用简体中文（不要使用繁体中文）
-- 分类选项：科技、娱乐、经济、体育、灾难、政治、综合
-- 人名、品牌名、产品名、地名保持原文（英文/马来文），不要翻译成中文（如Nabil Halimi、PKR、Malaysiakini等应保持原样）
-- 只使用文章中明确提到的数字和事实
-- 不要添加文章中未提及的产品或信息
-- 摘要不能只是简单改写标题，必须补充标题中没有的细节（如具体机型、价格、合作方、时间等）
-- 保持专业、清晰的表达
-- **重要：请仔细阅读文章内容，不要只基于标题生成摘要**
-
-文章标题: {title}
-
-文章内容:
-{article_content}
-
-提取的事实: {facts_block}
-
-请按以下格式回复：
-标题: 【分类】中文标题
-摘要: 中文摘要"""
+        prompt = _build_summary_prompt(title, budget_article_text(article_content, title=title), facts_block)
 
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
         print(f"  📤 Sending request to Gemini API...")
-        response = model.generate_content(prompt)
-        
-        if not response.text:
-            raise Exception("Empty response from Gemini")
-        
-        content = response.text.strip()
+        content = _gemini_generate_text(prompt, accept=_accept_summary_reply(title))
         print(f"  📡 Gemini API response received: {len(content)} characters")
         
-        # Parse the response to extract title and summary
+        # Parse JSON (or legacy 标题:/摘要: lines), then repair only a failed field
         try:
-            lines = content.split('\n')
-            chinese_title = ""
-            summary = ""
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('标题:'):
-                    chinese_title = line.replace('标题:', '').strip()
-                elif line.startswith('摘要:'):
-                    summary = line.replace('摘要:', '').strip()
-                elif not chinese_title and line and not line.startswith('摘要:'):
-                    # If no title found yet, this might be the title
-                    chinese_title = line
-                elif chinese_title and line and not line.startswith('标题:'):
-                    # If we have a title, this is part of the summary
-                    if summary:
-                        summary += " " + line
-                    else:
-                        summary = line
+            chinese_title, summary = _parse_summary_response(content)
+            chinese_title, summary = _repair_summary_fields("gemini", chinese_title, summary, article_content)
             
             # If we couldn't parse properly, use the whole content as summary
             if not chinese_title or not summary:
@@ -1491,18 +3493,19 @@ def gemini_summarize_content(title, article_content):
         
     except Exception as e:
         print(f"  ❌ Gemini API error: {e}")
+        if not (article_content or "").strip():
+            raise  # nothing to truncate: let the caller fall back
         # Fallback to simple truncation
         return f"【科技】{title}", (article_content[:500] + "..." if len(article_content) > 500 else article_content)
 
-def _mimo_api_request_with_retry(url, headers, payload, max_retries=5, initial_delay=1):
+def _mimo_api_request_with_retry(payload, max_retries=5, initial_delay=1, stats=None):
     """Make MiMo API request with exponential backoff retry logic for rate limiting (429 errors)
     
     Args:
-        url: API endpoint URL
-        headers: Request headers
-        payload: Request payload
+        payload: Request payload (posted through the shared MIMO_CLIENT session)
         max_retries: Maximum number of retry attempts (default: 5)
         initial_delay: Initial delay in seconds before first retry (default: 1)
+        stats: Optional dict updated with "retries" and the last HTTP "status"
     
     Returns:
         Response object from successful request
@@ -1511,15 +3514,23 @@ def _mimo_api_request_with_retry(url, headers, payload, max_retries=5, initial_d
         Exception: If all retries are exhausted or non-retryable error occurs
     """
     last_exception = None
+    limiter = RATE_LIMITERS["mimo"]
+    est_tokens = sum(_estimate_tokens(m.get("content", "")) for m in payload.get("messages", [])) + int(payload.get("max_tokens") or 0)
     
+    stats = stats if stats is not None else {}
     for attempt in range(max_retries):
+        _check_cancelled()
+        stats["retries"] = attempt
         try:
             if attempt == 0:
                 print(f"  📤 Sending request to MiMo API...")
             else:
                 print(f"  📤 Retrying MiMo API request... (attempt {attempt + 1}/{max_retries})")
             
-            r = requests.post(url, headers=headers, json=payload, timeout=TIMEOUT)
+            # Wait for the shared MiMo request/token budget (and any Retry-After pause)
+            limiter.acquire(est_tokens)
+            r = MIMO_CLIENT.post(payload)
+            stats["status"] = r.status_code
             
             # Check for rate limit (429) error before raising
             if r.status_code == 429:
@@ -1538,9 +3549,9 @@ def _mimo_api_request_with_retry(url, headers, payload, max_retries=5, initial_d
                     wait_time = initial_delay * (2 ** attempt)
                     print(f"  ⏳ Rate limit reached (429). Waiting {wait_time} seconds before retry...")
                 
-                # If this is not the last attempt, wait and retry
+                # If this is not the last attempt, pause all MiMo callers and retry
                 if attempt < max_retries - 1:
-                    time.sleep(wait_time)
+                    limiter.defer(wait_time)
                     continue
                 else:
                     # Last attempt failed, raise the error
@@ -1567,7 +3578,7 @@ def _mimo_api_request_with_retry(url, headers, payload, max_retries=5, initial_d
                         wait_time = initial_delay * (2 ** attempt)
                     
                     print(f"  ⏳ Rate limit reached (429). Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
+                    limiter.defer(wait_time)
                     continue
                 else:
                     # Last attempt failed
@@ -1581,7 +3592,7 @@ def _mimo_api_request_with_retry(url, headers, payload, max_retries=5, initial_d
             if attempt < max_retries - 1:
                 wait_time = initial_delay * (2 ** attempt)
                 print(f"  ⚠️  Request error: {e}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
+                _sleep_cancellable(wait_time)
                 continue
             else:
                 raise
@@ -1592,7 +3603,7 @@ def _mimo_api_request_with_retry(url, headers, payload, max_retries=5, initial_d
     else:
         raise Exception("Failed to make MiMo API request after all retries")
 
-def mimo_summarize_from_url(title, article_url):
+def mimo_summarize_from_url(title, article_url, article_content=None):
     """Use Xiaomi MiMo LLM to read and summarize the article directly from URL"""
     if not MIMO_AVAILABLE:
         raise Exception("MiMo API not available")
@@ -1600,8 +3611,9 @@ def mimo_summarize_from_url(title, article_url):
     try:
         print(f"  🤖 MiMo reading and summarizing: {title[:50]}...")
         
-        # Read article content first
-        article_content = read_article_content(article_url)
+        # Read article content first (unless the caller already fetched it)
+        if article_content is None:
+            article_content = read_article_content(article_url)
         if not article_content or len(article_content.strip()) < 50:
             raise Exception("Failed to read article content or content too short")
         
@@ -1615,138 +3627,39 @@ def mimo_summarize_from_url(title, article_url):
             print(f"  🧹 Cleaned HTML tags from content")
         
         # Extract facts for grounding
-        facts = _extract_numeric_facts(article_content)
-        facts_list = sorted(list(facts.get('raw_tokens', set())))
-        facts_block = "\n".join(facts_list[:40])
-        
-        # Extract mentioned products and brands
-        source_lower = article_content.lower()
-        mentioned_products = []
-        mentioned_brands = []
-        
-        # Brand detection patterns (same as Gemini)
-        brand_patterns = {
-            'xiaomi': ['xiaomi', 'mi ', 'redmi', 'poco'],
-            'samsung': ['samsung', 'galaxy'],
-            'apple': ['apple', 'iphone', 'ipad', 'mac'],
-            'vivo': ['vivo', 'iqoo'],
-            'oppo': ['oppo', 'oneplus'],
-            'huawei': ['huawei', 'honor'],
-            'realme': ['realme'],
-            'google': ['google', 'pixel'],
-            'sony': ['sony', 'xperia'],
-            'lg': ['lg'],
-            'motorola': ['motorola', 'moto']
-        }
-        
-        # Detect mentioned brands
-        for brand, patterns in brand_patterns.items():
-            if any(pattern in source_lower for pattern in patterns):
-                mentioned_brands.append(brand.title())
-        
-        # Look for model numbers
-        import re
-        model_patterns = [
-            r'\b[a-z]+\s*\d{2,4}[a-z]*\b',  # Like "X300", "Y28", "15T"
-            r'\b[a-z]+\s*[a-z]+\s*\d+[a-z]*\b',  # Like "iPhone 15", "Redmi Note 12"
-        ]
-        
-        for pattern in model_patterns:
-            matches = re.findall(pattern, source_lower)
-            for match in matches:
-                if len(match) > 3:
-                    mentioned_products.append(match.title())
+        facts_block = _facts_block(article_content)
         
-        products_context = f"Products mentioned in source: {', '.join(mentioned_products)}" if mentioned_products else "No specific products mentioned"
-        brands_context = f"Brands mentioned in source: {', '.join(mentioned_brands)}" if mentioned_brands else "No specific brands mentioned"
+        # Mentioned products and brands (shared, cached extractor)
+        products_context, brands_context = _entities_prompt_context(extract_entities(article_content))
         
-        # Limit content length for API (keep more content than before)
+        # Fit content into the prompt budget, keeping the salient / fact-bearing sentences
         original_length = len(article_content)
-        if len(article_content) > 5000:
-            article_content_truncated = article_content[:5000]
-            print(f"  ✂️  Truncated content from {original_length} to 5000 characters for MiMo API")
-        else:
-            article_content_truncated = article_content
-            print(f"  📄 Sending {len(article_content)} characters of content to MiMo")
-        
-        # Log content preview to verify it's not empty
-        if len(article_content.strip()) < 100:
-            print(f"  ⚠️  WARNING: Content seems too short ({len(article_content)} chars)")
-        else:
-            print(f"  📝 Content preview (first 300 chars): {article_content[:300]}...")
-        
-        # Create MiMo prompt (same format as Gemini)
-        prompt = f"""请阅读以下新闻文章并提供：
-
-1. **中文标题（带分类标签）** - 格式：【分类】中文标题
-2. **中文摘要** - 不超过100字，用2-3句完整的话总结新闻的关键信息（时间、地点、主体、关键数字和影响）
-
-要求：
-- 标题和摘要必须用简体中文（不要使用繁体中文）
-- 分类选项：科技、娱乐、经济、体育、灾难、政治、综合
-- 人名、品牌名、产品名、地名保持原文（英文/马来文），不要翻译成中文（如Nabil Halimi、PKR、Malaysiakini等应保持原样）
-- 只使用文章中明确提到的数字和事实
-- 不要添加文章中未提及的产品或信息
-- 摘要不能只是简单改写标题，必须补充标题中没有的细节（如具体机型、价格、合作方、时间等）
-- 保持专业、清晰的表达
-- **重要：请仔细阅读文章内容，不要只基于标题生成摘要**
-
-文章标题: {title}
-文章内容: {article_content_truncated}
-
-来源信息:
-{products_context}
-{brands_context}
-
-提取的事实: {facts_block}
-
-请按以下格式回复：
-标题: 【分类】中文标题
-摘要: 中文摘要"""
-
-        # Call MiMo API (OpenAI-compatible chat completions)
-        url = f"{MIMO_API_BASE}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {MIMO_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": MIMO_MODEL,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 2048
-        }
-        
-        # Use retry logic with exponential backoff for rate limiting
-        r = _mimo_api_request_with_retry(url, headers, payload)
-        data = r.json()
+        article_content_truncated = budget_article_text(article_content, title=title)
+        if len(article_content_truncated) < original_length:
+            print(f"  ✂️  Budgeted content from {original_length} to {len(article_content_truncated)} characters for MiMo API")
+        else:
+            print(f"  📄 Sending {len(article_content)} characters of content to MiMo")
         
-        if "choices" not in data or not data["choices"]:
-            raise Exception("Empty or invalid response from MiMo API")
+        # Log content preview to verify it's not empty
+        if len(article_content.strip()) < 100:
+            print(f"  ⚠️  WARNING: Content seems too short ({len(article_content)} chars)")
+        else:
+            print(f"  📝 Content preview (first 300 chars): {article_content[:300]}...")
         
-        content = data["choices"][0]["message"]["content"].strip()
+        # Create MiMo prompt (same format as Gemini)
+        prompt = _build_summary_prompt(
+            title, article_content_truncated, facts_block, read=True,
+            context=f"{products_context}\n{brands_context}",
+        )
+
+        # Call MiMo API (OpenAI-compatible chat completions, retried on 429, cached)
+        content = _mimo_chat_completion(prompt, temperature=0.7, max_tokens=2048, until=_summary_stream_check,
+                                        accept=_accept_summary_reply(title))
         print(f"  📡 MiMo API response received: {len(content)} characters")
         
-        # Parse the response (same as Gemini)
-        lines = content.split('\n')
-        chinese_title = ""
-        summary = ""
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('标题:'):
-                chinese_title = line.replace('标题:', '').strip()
-            elif line.startswith('摘要:'):
-                summary = line.replace('摘要:', '').strip()
-            elif not chinese_title and line and not line.startswith('摘要:'):
-                chinese_title = line
-            elif chinese_title and line and not line.startswith('标题:'):
-                if summary:
-                    summary += " " + line
-                else:
-                    summary = line
+        # Parse JSON (or legacy 标题:/摘要: lines), then repair only a failed field
+        chinese_title, summary = _parse_summary_response(content)
+        chinese_title, summary = _repair_summary_fields("mimo", chinese_title, summary, article_content)
         
         # Fallback if parsing failed
         if not chinese_title or not summary:
@@ -1781,11 +3694,11 @@ def mimo_summarize_content(title, article_content):
             article_content = " ".join(article_content.split())  # Normalize whitespace
             print(f"  🧹 Cleaned HTML tags from content")
         
-        # Limit content length for API (keep more content than before)
+        # Fit content into the prompt budget, keeping the salient / fact-bearing sentences
         original_length = len(article_content)
-        if len(article_content) > 5000:
-            article_content = article_content[:5000]
-            print(f"  ✂️  Truncated content from {original_length} to 5000 characters for MiMo API")
+        article_content = budget_article_text(article_content, title=title)
+        if len(article_content) < original_length:
+            print(f"  ✂️  Budgeted content from {original_length} to {len(article_content)} characters for MiMo API")
         else:
             print(f"  📄 Sending {len(article_content)} characters of content to MiMo")
         
@@ -1796,83 +3709,20 @@ def mimo_summarize_content(title, article_content):
             print(f"  📝 Content preview (first 300 chars): {article_content[:300]}...")
         
         # Extract facts for grounding
-        facts = _extract_numeric_facts(article_content)
-        facts_list = sorted(list(facts.get('raw_tokens', set())))
-        facts_block = "\n".join(facts_list[:40])
+        facts_block = _facts_block(article_content)
         
         # Create MiMo prompt
-        prompt = f"""请分析以下新闻文章并提供：
-
-1. **中文标题（带分类标签）** - 格式：【分类】中文标题
-2. **中文摘要** - 不超过100字，用2-3句完整的话总结新闻的关键信息（时间、地点、主体、关键数字和影响）
-
-要求：
-- 标题和摘要必须用简体中文（不要使用繁体中文）
-- 分类选项：科技、娱乐、经济、体育、灾难、政治、综合
-- 人名、品牌名、产品名、地名保持原文（英文/马来文），不要翻译成中文（如Nabil Halimi、PKR、Malaysiakini等应保持原样）
-- 只使用文章中明确提到的数字和事实
-- 不要添加文章中未提及的产品或信息
-- 摘要不能只是简单改写标题，必须补充标题中没有的细节（如具体机型、价格、合作方、时间等）
-- 保持专业、清晰的表达
-- **重要：请仔细阅读文章内容，不要只基于标题生成摘要**
-
-文章标题: {title}
-
-文章内容:
-{article_content}
-
-提取的事实: {facts_block}
-
-请按以下格式回复：
-标题: 【分类】中文标题
-摘要: 中文摘要"""
+        prompt = _build_summary_prompt(title, article_content, facts_block)
 
-        # Call MiMo API (OpenAI-compatible chat completions)
-        url = f"{MIMO_API_BASE}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {MIMO_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": MIMO_MODEL,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 2048
-        }
-        
-        # Use retry logic with exponential backoff for rate limiting
-        r = _mimo_api_request_with_retry(url, headers, payload)
-        data = r.json()
-        
-        if "choices" not in data or not data["choices"]:
-            raise Exception("Empty or invalid response from MiMo API")
-        
-        content = data["choices"][0]["message"]["content"].strip()
+        # Call MiMo API (OpenAI-compatible chat completions, retried on 429, cached)
+        content = _mimo_chat_completion(prompt, temperature=0.7, max_tokens=2048, until=_summary_stream_check,
+                                        accept=_accept_summary_reply(title))
         print(f"  📡 MiMo API response received: {len(content)} characters")
         
-        # Parse the response to extract title and summary
+        # Parse JSON (or legacy 标题:/摘要: lines), then repair only a failed field
         try:
-            lines = content.split('\n')
-            chinese_title = ""
-            summary = ""
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('标题:'):
-                    chinese_title = line.replace('标题:', '').strip()
-                elif line.startswith('摘要:'):
-                    summary = line.replace('摘要:', '').strip()
-                elif not chinese_title and line and not line.startswith('摘要:'):
-                    # If no title found yet, this might be the title
-                    chinese_title = line
-                elif chinese_title and line and not line.startswith('标题:'):
-                    # If we have a title, this is part of the summary
-                    if summary:
-                        summary += " " + line
-                    else:
-                        summary = line
+            chinese_title, summary = _parse_summary_response(content)
+            chinese_title, summary = _repair_summary_fields("mimo", chinese_title, summary, article_content)
             
             # If we couldn't parse properly, use the whole content as summary
             if not chinese_title or not summary:
@@ -1896,18 +3746,156 @@ def mimo_summarize_content(title, article_content):
         # Re-raise exception so fallback to Gemini can work
         raise
 
+# ---------------------------------------------------------------------------
+# Hedged MiMo -> Gemini requests
+# ---------------------------------------------------------------------------
+
+# When both providers are configured, a summary request that MiMo has not
+# answered within its recent p95 latency is also sent to Gemini; the first
+# valid answer wins and the other call is cancelled. Cancellation only takes
+# effect between stream chunks or retries, so hedging needs LLM_STREAM (the
+# MiMo leg can then be dropped mid-reply); the Gemini leg is not streamed and
+# is billed in full once started, so a hedge that fires can pay for both.
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "1") == "1" and LLM_STREAM
+try:
+    LLM_HEDGE_DELAY_SEC = float(os.environ.get("LLM_HEDGE_DELAY_SEC", "8"))
+except Exception:
+    LLM_HEDGE_DELAY_SEC = 8.0
+try:
+    LLM_HEDGE_MIN_DELAY_SEC = float(os.environ.get("LLM_HEDGE_MIN_DELAY_SEC", "2"))
+except Exception:
+    LLM_HEDGE_MIN_DELAY_SEC = 2.0
+try:
+    LLM_HEDGE_MAX_DELAY_SEC = float(os.environ.get("LLM_HEDGE_MAX_DELAY_SEC", "20"))
+except Exception:
+    LLM_HEDGE_MAX_DELAY_SEC = 20.0
+
+_HEDGE_MIN_SAMPLES = 20
+HEDGE_STATS = {"requests": 0, "hedged": 0, "mimo": 0, "gemini": 0}
+_HEDGE_STATS_LOCK = threading.Lock()
+
+
+def _count_hedge(key: str):
+    with _HEDGE_STATS_LOCK:
+        HEDGE_STATS[key] += 1
+
+
+def _hedge_delay() -> float:
+    """MiMo's measured p95 for this prompt type (else across all prompt types),
+    clamped; the static delay until enough samples exist."""
+    p95 = LLM_TELEMETRY.percentile("mimo", 0.95, kind=_current_prompt_kind(), min_samples=_HEDGE_MIN_SAMPLES)
+    if p95 is None:
+        p95 = LLM_TELEMETRY.percentile("mimo", 0.95, min_samples=_HEDGE_MIN_SAMPLES)
+    if p95 is None:
+        return LLM_HEDGE_DELAY_SEC
+    return min(LLM_HEDGE_MAX_DELAY_SEC, max(LLM_HEDGE_MIN_DELAY_SEC, p95))
+
+
+
+
+def _is_valid_ai_result(title: str, chinese_title: str, summary: str) -> bool:
+    """Reject the placeholder / English-fallback outputs the provider functions return on failure."""
+    if (chinese_title or "").strip() in _PLACEHOLDER_TITLES or (summary or "").strip() in _PLACEHOLDER_SUMMARIES:
+        return False
+    if chinese_title.strip() == f"【科技】{title}" or chinese_title.strip() == title:
+        return False
+    return not text_profile(summary).is_mostly_english
+
+
+def _hedged_summarize(title: str, mimo_call, gemini_call):
+    """Race mimo_call against gemini_call (started after _hedge_delay()).
+
+    Returns (chinese_title, summary, provider) of the first valid answer; the
+    other provider's thread is told to stop via its cancel Event.
+    """
+    results = queue.Queue()
+    cancels = {}
+
+    def launch(provider, call):
+        cancel = cancels[provider] = threading.Event()
+        deadline = _current_deadline()
+        prompt_kind = getattr(_CALL_CONTEXT, "prompt_kind", None)
+
+        def run():
+            _CALL_CONTEXT.cancel = cancel
+            _CALL_CONTEXT.deadline = deadline
+            _CALL_CONTEXT.prompt_kind = prompt_kind
+            try:
+                results.put((provider, call(), None))
+            except Exception as e:
+                results.put((provider, None, e))
+
+        threading.Thread(target=run, name=f"hedge-{provider}", daemon=True).start()
+
+    _count_hedge("requests")
+    started = time.monotonic()
+    delay = _hedge_delay()
+    launch("mimo", mimo_call)
+    pending, fallback, last_error = 1, None, None
+    while pending:
+        deadline = _current_deadline()
+        try:
+            timeout = None if "gemini" in cancels else max(0.0, delay - (time.monotonic() - started))
+            if deadline is not None:
+                timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+            provider, out, err = results.get(timeout=timeout)
+        except queue.Empty:
+            if deadline is not None and deadline.expired():
+                for cancel in cancels.values():
+                    cancel.set()
+                raise DeadlineExceeded("item deadline exceeded while waiting for LLM")
+            print(f"  🏎️  MiMo slower than {delay:.1f}s; hedging with Gemini")
+            _count_hedge("hedged")
+            launch("gemini", gemini_call)
+            pending += 1
+            continue
+        pending -= 1
+        if err is None and _is_valid_ai_result(title, *out):
+            for other, cancel in cancels.items():
+                if other != provider:
+                    cancel.set()
+            _count_hedge(provider)
+            if len(cancels) > 1:
+                print(f"  🏁 Hedged request won by {provider} after {time.monotonic() - started:.1f}s")
+            return out[0], out[1], provider
+        if err is None and fallback is None and (out[1] or "").strip():
+            fallback = (out[0], out[1], provider)
+        if err is not None:
+            last_error = err
+        if "gemini" not in cancels:
+            # MiMo failed outright: no point waiting for the hedge delay
+            print(f"  ⚠️  MiMo failed ({err or 'invalid output'}), trying Gemini")
+            launch("gemini", gemini_call)
+            pending += 1
+    if fallback:
+        return fallback
+    raise last_error or Exception("Neither MiMo nor Gemini returned a summary")
+
 def ai_summarize_from_url(title, article_url):
     """Try MiMo first, fallback to Gemini, for summarizing from URL
     Returns: (chinese_title, summary, provider) where provider is 'mimo' or 'gemini'
     """
-    if MIMO_AVAILABLE:
+    use_mimo, use_gemini = _routable_providers()
+    if LLM_HEDGE and use_mimo and use_gemini:
+        # Fetch once here so the two legs do not download the article twice
+        article_content = read_article_content(article_url)
+        if not article_content or len(article_content.strip()) < 50:
+            raise Exception("Failed to read article content or content too short")
+        return _hedged_summarize(
+            title,
+            lambda: mimo_summarize_from_url(title, article_url, article_content),
+            lambda: gemini_summarize_from_url(title, article_url, article_content),
+        )
+    if use_mimo:
         try:
             chinese_title, summary = mimo_summarize_from_url(title, article_url)
             return chinese_title, summary, "mimo"
         except Exception as e:
             print(f"  ⚠️  MiMo failed, trying Gemini: {e}")
+    elif MIMO_AVAILABLE:
+        print(f"  🔌 MiMo circuit open, using Gemini directly")
     
-    if GEMINI_AVAILABLE:
+    if use_gemini:
         try:
             chinese_title, summary = gemini_summarize_from_url(title, article_url)
             return chinese_title, summary, "gemini"
@@ -1920,14 +3908,23 @@ def ai_summarize_content(title, article_content):
     """Try MiMo first, fallback to Gemini, for summarizing content
     Returns: (chinese_title, summary, provider) where provider is 'mimo' or 'gemini'
     """
-    if MIMO_AVAILABLE:
+    use_mimo, use_gemini = _routable_providers()
+    if LLM_HEDGE and use_mimo and use_gemini:
+        return _hedged_summarize(
+            title,
+            lambda: mimo_summarize_content(title, article_content),
+            lambda: gemini_summarize_content(title, article_content),
+        )
+    if use_mimo:
         try:
             chinese_title, summary = mimo_summarize_content(title, article_content)
             return chinese_title, summary, "mimo"
         except Exception as e:
             print(f"  ⚠️  MiMo failed, trying Gemini: {e}")
+    elif MIMO_AVAILABLE:
+        print(f"  🔌 MiMo circuit open, using Gemini directly")
     
-    if GEMINI_AVAILABLE:
+    if use_gemini:
         try:
             chinese_title, summary = gemini_summarize_content(title, article_content)
             return chinese_title, summary, "gemini"
@@ -1936,6 +3933,287 @@ def ai_summarize_content(title, article_content):
     
     raise Exception("Neither MiMo nor Gemini available")
 
+# ---------------------------------------------------------------------------
+# Multi-article batch summarization
+# ---------------------------------------------------------------------------
+
+# Articles packed into one LLM request (1 disables batching) and the per-article
+# token budget (see budget_article_text) inside that request.
+try:
+    LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", "4"))
+except Exception:
+    LLM_BATCH_SIZE = 4
+try:
+    LLM_BATCH_ARTICLE_TOKENS = int(os.environ.get("LLM_BATCH_ARTICLE_TOKENS", "800"))
+except Exception:
+    LLM_BATCH_ARTICLE_TOKENS = 800
+
+
+
+def _extract_json_payload(text: str, opener: str = "[", closer: str = "]"):
+    """Parse the outermost JSON array/object in an LLM reply (tolerates ``` fences and chatter)."""
+    t = (text or "").strip()
+    start, end = t.find(opener), t.rfind(closer)
+    if start < 0 or end <= start:
+        raise ValueError("no JSON payload in response")
+    return json.loads(t[start:end + 1])
+
+
+def _validate_batch_entry(entry, titles):
+    """Return (index, chinese_title, summary) for a well-formed entry, else None.
+
+    titles are the original article titles in request order; an entry must pass
+    the same checks as a single-item reply (_is_valid_ai_result and a non-English
+    headline), so failures go back to the single-item path and its repair."""
+    if not isinstance(entry, dict):
+        return None
+    try:
+        idx = int(entry.get("id")) - 1
+    except Exception:
+        return None
+    title = str(entry.get("title") or "").strip()
+    summary = str(entry.get("summary") or "").strip()
+    category = str(entry.get("category") or "").strip()
+    if not 0 <= idx < len(titles) or not _is_valid_ai_result(titles[idx], title, summary):
+        return None
+    headline = _extract_title_headline_for_lang_check(title)
+    if not headline or _title_headline_is_mostly_english(title):
+        return None
+    if category not in ALLOWED_LLM_CATEGORIES:
+        category = "综合"
+    return idx, f"【{category}】{headline}", summary
+
+
+def _batch_summary_prompt(entries) -> str:
+    blocks = []
+    for i, (title, content) in enumerate(entries, 1):
+        content = budget_article_text(content, LLM_BATCH_ARTICLE_TOKENS, title)
+        blocks.append(f"### 文章 {i}\n文章标题: {title}\n文章内容: {content}\n提取的事实: {_facts_block(content)}")
+    articles = "\n\n".join(blocks)
+    return f"""请分别阅读以下{len(entries)}篇新闻文章，为每一篇提供中文标题、分类和中文摘要。
+
+要求：
+- 标题和摘要必须用简体中文（不要使用繁体中文）
+- 分类必须是：{'、'.join(ALLOWED_LLM_CATEGORIES)} 之一
+- 摘要不超过100字，用2-3句完整的话总结新闻的关键信息（时间、地点、主体、关键数字和影响）
+- 人名、品牌名、产品名、地名保持原文（英文/马来文），不要翻译成中文（如Nabil Halimi、PKR、Malaysiakini等应保持原样）
+- 只使用该篇文章中明确提到的数字和事实，不要混用其它文章的信息
+- 摘要不能只是简单改写标题，必须补充标题中没有的细节（如具体机型、价格、合作方、时间等）
+
+{articles}
+
+只输出一个JSON数组，不要其它文字，每篇文章一个对象，id与文章编号一致：
+[{{"id": 1, "title": "【分类】中文标题", "summary": "中文摘要", "category": "分类"}}]"""
+
+
+def ai_summarize_batch(entries):
+    """Summarize several (title, article_content) pairs with one LLM request.
+
+    Returns a list aligned with entries of (chinese_title, summary, provider).
+    Entries missing or invalid in the batch reply are retried one by one via
+    ai_summarize_content; an entry is None only if that fails as well.
+    """
+    results = [None] * len(entries)
+    if len(entries) > 1:
+        prompt = _batch_summary_prompt(entries)
+        max_tokens = min(8192, 256 + 400 * len(entries))
+        titles = [title for title, _content in entries]
+        accept = _accept_batch_reply(titles)
+        providers = []
+        use_mimo, use_gemini = _routable_providers()
+        if use_mimo:
+            providers.append(("mimo", lambda: _mimo_chat_completion(prompt, temperature=0.7, max_tokens=max_tokens, accept=accept)))
+        if use_gemini:
+            providers.append(("gemini", lambda: _gemini_generate_text(prompt, accept=accept)))
+        for provider, call in providers:
+            try:
+                print(f"  📦 Batch summarizing {len(entries)} articles with {provider}...")
+                with _llm_prompt_kind("batch"):
+                    raw = call()
+                parsed = _extract_json_payload(raw)
+                if not isinstance(parsed, list):
+                    raise ValueError(f"expected a JSON array, got {type(parsed).__name__}")
+                for entry in parsed:
+                    ok = _validate_batch_entry(entry, titles)
+                    if ok and results[ok[0]] is None:
+                        results[ok[0]] = (ok[1], ok[2], provider)
+                break
+            except Exception as e:
+                print(f"  ⚠️  Batch summarization via {provider} failed: {e}")
+        print(f"  📦 Batch returned {sum(r is not None for r in results)}/{len(entries)} valid summaries")
+    for i, (title, content) in enumerate(entries):
+        if results[i] is None:
+            try:
+                results[i] = ai_summarize_content(title, content)
+            except Exception as e:
+                print(f"  ⚠️  Per-item fallback failed for {title[:40]}: {e}")
+    return results
+
+
+_SUMMARY_POOL = None
+
+
+def _summary_pool() -> ThreadPoolExecutor:
+    global _SUMMARY_POOL
+    if _SUMMARY_POOL is None:
+        _SUMMARY_POOL = ThreadPoolExecutor(max_workers=max(1, SUMMARY_WORKERS), thread_name_prefix="summarize")
+    return _SUMMARY_POOL
+
+
+def prepare_ai_summaries(candidates, story_simhashes):
+    """Fetch and summarize upcoming items in parallel, LLM_BATCH_SIZE per request.
+
+    Sets it["_article_content"] (consumed instead of a second fetch) and, on
+    success, it["_ai_result"] = (chinese_title, summary, provider) for main().
+    Items whose story cluster already has a result are not sent to the LLM,
+    and near-duplicates within the round share their leader's result.
+    """
+    pool = _summary_pool()
+    cancel = getattr(_CALL_CONTEXT, "cancel", None)
+    ready = []
+    followers = []  # (item, leader item) pairs resolved after the batch calls
+    fetch = lambda it: _run_with_deadline(ITEM_DEADLINE_SEC, read_article_content, it["url"], cancel=cancel)
+    for it, content in zip(candidates, pool.map(fetch, candidates)):
+        it["_article_content"] = content
+        simhash = _simhash64(content) if content else 0
+        if not content or len(content) <= 100 or story_simhashes.find(simhash):
+            continue
+        cached = cached_story_summary(it, simhash)
+        if cached:
+            it["_ai_result"] = cached
+            continue
+        it["_simhash"] = simhash
+        probe = _story_probe(it, simhash)
+        leader = next((r for r in ready if _story_matches(probe, r["_cluster_probe"])), None)
+        if leader is not None:
+            followers.append((it, leader))
+            continue
+        it["_cluster_probe"] = _with_story_sigs({
+            "url": it.get("url", ""), "title": "", "title_key": "",
+            "orig_title": it.get("orig_title") or it.get("title", ""), "simhash": simhash,
+        })
+        ready.append(it)
+    size = max(1, LLM_BATCH_SIZE)
+    chunks = [ready[i:i + size] for i in range(0, len(ready), size)]
+    if chunks:
+        print(f"  🧵 Preparing {len(ready)} summaries in {len(chunks)} request(s) with {max(1, SUMMARY_WORKERS)} workers")
+    summarize_chunk = lambda chunk: _run_with_deadline(
+        ITEM_DEADLINE_SEC, ai_summarize_batch, [(it["title"], it["_article_content"]) for it in chunk], cancel=cancel
+    )
+    for chunk, results in zip(chunks, pool.map(summarize_chunk, chunks)):
+        for it, result in zip(chunk, results):
+            it.pop("_cluster_probe", None)
+            if result:
+                it["_ai_result"] = result
+                STORY_CLUSTERS.put(it, *result, simhash=it.get("_simhash", 0))
+    for it, leader in followers:
+        if "_ai_result" in leader:
+            print(f"  🧩 Sharing batch summary with near-duplicate: {it['title'][:50]}...")
+            it["_ai_result"] = leader["_ai_result"]
+            it["_cluster_id"] = leader.get("_cluster_id")
+
+
+# ---------------------------------------------------------------------------
+# Look-ahead pre-summarization
+# ---------------------------------------------------------------------------
+# main() idles SEND_INTERVAL_SEC after every push and COLLECT_INTERVAL_SEC
+# between cycles. The look-ahead spends those windows fetching and summarizing
+# the next ranked candidates in the background, so when an item's turn comes
+# it only has to be rendered and sent. Candidates a cycle did not reach are
+# carried into the next one (SEEN stops the collector from returning them).
+# Every job is capped by the sends left in the cycle it prepares for, since a
+# summary for an item that is never pushed is a wasted paid call; in ONE_SHOT
+# mode nothing is carried and a job still running at exit is cancelled.
+
+# Upcoming items prepared per idle window (0 disables the look-ahead).
+try:
+    LOOKAHEAD_ITEMS = int(os.environ.get("LOOKAHEAD_ITEMS", "3"))
+except Exception:
+    LOOKAHEAD_ITEMS = 3
+
+# Unreached candidates carried into the next cycle.
+try:
+    LOOKAHEAD_CARRY_MAX = int(os.environ.get("LOOKAHEAD_CARRY_MAX", "10"))
+except Exception:
+    LOOKAHEAD_CARRY_MAX = 10
+
+
+class LookAhead:
+    """One background prepare_ai_summaries job at a time.
+
+    The job writes "_article_content" / "_ai_result" into the item dicts it
+    was given; main() calls wait_for(it) before reading an item, which joins
+    the job only if that item is part of it.
+    """
+
+    def __init__(self, max_items=LOOKAHEAD_ITEMS):
+        self.max_items = max(0, int(max_items))
+        self._executor = None
+        self._future = None
+        self._cancel = None
+        self._items = []
+        self.prepared = 0
+
+    def start(self, candidates, story_simhashes, budget):
+        """Submit up to min(max_items, budget) candidates not prepared yet, where
+        budget is the number of pushes still allowed; no-op while a job runs."""
+        limit = min(self.max_items, max(0, int(budget)))
+        if limit <= 0 or self._future is not None:
+            return
+        todo = [it for it in candidates if "_ai_result" not in it and "_article_content" not in it][:limit]
+        if not todo:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lookahead")
+        print(f"  🔭 Look-ahead: preparing {len(todo)} upcoming item(s) in the background")
+        self._items = todo
+        self._cancel = threading.Event()
+        self._future = self._executor.submit(self._run, self._cancel, todo, story_simhashes)
+
+    @staticmethod
+    def _run(cancel, todo, story_simhashes):
+        _CALL_CONTEXT.cancel = cancel
+        try:
+            prepare_ai_summaries(todo, story_simhashes)
+        finally:
+            _CALL_CONTEXT.cancel = None
+
+    def wait_for(self, it):
+        if self._future is not None and any(x is it for x in self._items):
+            self.join()
+
+    def join(self):
+        if self._future is None:
+            return
+        started = time.time()
+        try:
+            self._future.result()
+        except Exception as e:
+            print(f"  ⚠️  Look-ahead failed: {e}")
+        ready = sum(1 for it in self._items if "_ai_result" in it)
+        self.prepared += ready
+        waited = time.time() - started
+        if waited >= 0.5:
+            print(f"  🔭 Look-ahead: waited {waited:.1f}s, {ready}/{len(self._items)} summaries ready")
+        self._future = None
+        self._items = []
+
+    def shutdown(self):
+        """Stop for good: cancel the running job's remaining LLM calls and drop queued work."""
+        if self._cancel is not None:
+            self._cancel.set()
+        if self._executor is not None:
+            if self._future is not None and not self._future.done():
+                print(f"  🔭 Look-ahead: cancelling {len(self._items)} unfinished item(s)")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._future = None
+        self._items = []
+
+
+LOOKAHEAD = LookAhead()
+
+
 def _extract_title_headline_for_lang_check(title: str) -> str:
     """Part after 【分类】; used so a Chinese tag does not hide an English headline."""
     if not (title or "").strip():
@@ -1950,9 +4228,17 @@ def _title_headline_is_mostly_english(title: str) -> bool:
     h = _extract_title_headline_for_lang_check(title)
     if not h:
         return False
-    if any("\u4e00" <= ch <= "\u9fff" for ch in h):
-        return False
-    return _is_mostly_english(h)
+    return text_profile(h).is_mostly_english
+
+def _title_stream_check(text: str):
+    """Stream stop rule for title-only replies: done at the first complete
+    标题:/【分类】 line, abort after a few other lines or a runaway line."""
+    lines = _complete_stream_lines(text)
+    if any(line.startswith("标题:") or line.startswith("【") for line in lines):
+        return "done"
+    if len(lines) > _STREAM_PREAMBLE_LINES or len(text) > _STREAM_MAX_UNMARKED_CHARS:
+        return "abort"
+    return None
 
 def _parse_title_only_from_llm_response(content: str) -> str:
     for line in (content or "").split("\n"):
@@ -1967,7 +4253,7 @@ def mimo_regenerate_chinese_title_only(reference_title: str, chinese_summary: st
         raise Exception("MiMo API not available")
     excerpt_block = ""
     if article_excerpt and len(article_excerpt.strip()) > 80:
-        excerpt_block = f"\n文章摘录（供核对事实，请优先与摘要一致）：\n{article_excerpt.strip()[:4000]}\n"
+        excerpt_block = f"\n文章摘录（供核对事实，请优先与摘要一致）：\n{budget_article_text(article_excerpt, PROMPT_EXCERPT_TOKEN_BUDGET, reference_title)}\n"
     prompt = f"""先前生成的新闻标题中，【分类】后的主标题仍是英文。请根据下面已写好的中文摘要{('与文章摘录' if excerpt_block else '')}，只重新写一条中文标题。
 
 要求：
@@ -1981,22 +4267,9 @@ def mimo_regenerate_chinese_title_only(reference_title: str, chinese_summary: st
 中文摘要：
 {chinese_summary}
 {excerpt_block}"""
-    url = f"{MIMO_API_BASE}/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {MIMO_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    payload = {
-        "model": MIMO_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.35,
-        "max_tokens": 1024,
-    }
-    r = _mimo_api_request_with_retry(url, headers, payload)
-    data = r.json()
-    if "choices" not in data or not data["choices"]:
-        raise Exception("Empty or invalid response from MiMo API")
-    raw = data["choices"][0]["message"]["content"].strip()
+    with _llm_prompt_kind("title"):
+        raw = _mimo_chat_completion(prompt, temperature=0.35, max_tokens=1024, until=_title_stream_check,
+                                    accept=_accept_title_reply)
     return _parse_title_only_from_llm_response(raw)
 
 def gemini_regenerate_chinese_title_only(reference_title: str, chinese_summary: str, article_excerpt: str | None):
@@ -2004,7 +4277,7 @@ def gemini_regenerate_chinese_title_only(reference_title: str, chinese_summary:
         raise Exception("Gemini API not available")
     excerpt_block = ""
     if article_excerpt and len(article_excerpt.strip()) > 80:
-        excerpt_block = f"\n文章摘录（供核对事实，请优先与摘要一致）：\n{article_excerpt.strip()[:4000]}\n"
+        excerpt_block = f"\n文章摘录（供核对事实，请优先与摘要一致）：\n{budget_article_text(article_excerpt, PROMPT_EXCERPT_TOKEN_BUDGET, reference_title)}\n"
     prompt = f"""先前生成的新闻标题中，【分类】后的主标题仍是英文。请根据下面已写好的中文摘要{('与文章摘录' if excerpt_block else '')}，只重新写一条中文标题。
 
 要求：
@@ -2018,247 +4291,368 @@ def gemini_regenerate_chinese_title_only(reference_title: str, chinese_summary:
 中文摘要：
 {chinese_summary}
 {excerpt_block}"""
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    response = model.generate_content(prompt)
-    if not response.text:
-        raise Exception("Empty response from Gemini")
-    return _parse_title_only_from_llm_response(response.text.strip())
+    with _llm_prompt_kind("title"):
+        raw = _gemini_generate_text(prompt, accept=_accept_title_reply)
+    return _parse_title_only_from_llm_response(raw)
 
 def ai_regenerate_chinese_title_only(reference_title: str, chinese_summary: str, article_excerpt: str | None) -> str:
-    if MIMO_AVAILABLE:
+    use_mimo, use_gemini = _routable_providers()
+    if use_mimo:
         try:
             return mimo_regenerate_chinese_title_only(reference_title, chinese_summary, article_excerpt)
         except Exception as e:
             print(f"  ⚠️  MiMo title regeneration failed, trying Gemini: {e}")
-    if GEMINI_AVAILABLE:
+    if use_gemini:
         return gemini_regenerate_chinese_title_only(reference_title, chinese_summary, article_excerpt)
     raise Exception("Neither MiMo nor Gemini available for title regeneration")
 
 def _article_excerpt_for_title_regen(it: dict) -> str | None:
     t = it.get("_fetched_article_text")
     if isinstance(t, str) and len(t.strip()) > 120:
-        return t.strip()[:4500]
+        return t.strip()
     try:
         c = read_article_content(it["url"])
         if c and len((c or "").strip()) > 120:
-            return c.strip()[:4500]
+            return c.strip()
     except Exception:
         pass
     return None
 
-def _is_mostly_english(text: str) -> bool:
-    try:
-        if not text:
-            return False
-        
-        # Count English letters
-        english_letters = sum(1 for ch in text if ('a' <= ch.lower() <= 'z'))
-        # Count Chinese characters (CJK Unified Ideographs)
-        chinese_chars = sum(1 for ch in text if '\u4e00' <= ch <= '\u9fff')
-        # Count total alphabetic characters
-        total_alpha = sum(1 for ch in text if ch.isalpha())
-        
-        if total_alpha == 0:
-            return False
-        
-        # If there are Chinese characters, it's not mostly English
-        if chinese_chars > 0:
-            return False
-        
-        # If more than 50% are English letters, consider it mostly English
-        return (english_letters / total_alpha) > 0.5
-    except Exception:
-        return False
+# Common Malay function words; a handful of these marks Latin text as Malay.
+_MALAY_HINT_WORDS = frozenset({
+    "yang", "dan", "untuk", "dengan", "kepada", "dalam", "akan", "telah", "tidak",
+    "ini", "itu", "oleh", "pada", "bagi", "dari", "ke", "di", "adalah", "juga", "kerana",
+})
 
-def _contains_kw(text_lc: str, keywords):
-    import re
-    for kw in keywords:
-        k = kw.lower()
-        # Use word-boundary matching for plain latin words to avoid 'goal' matching 'global'
-        if all(('a' <= ch <= 'z') or ch == ' ' for ch in k) and len(k) >= 3:
-            # FIX: use raw string r"\b" (single backslash) for real regex word boundary
-            pattern = r"\b" + re.escape(k) + r"\b"
-            if re.search(pattern, text_lc):
-                return True
+
+class TextProfile:
+    """Script histogram of a string: ASCII Latin letters, CJK ideographs,
+    other alphabetic characters, non-ASCII characters and Malay hint words."""
+
+    __slots__ = ("latin", "cjk", "other_alpha", "non_ascii", "words", "malay_words")
+
+    def __init__(self, latin=0, cjk=0, other_alpha=0, non_ascii=0, words=0, malay_words=0):
+        self.latin = latin
+        self.cjk = cjk
+        self.other_alpha = other_alpha
+        self.non_ascii = non_ascii
+        self.words = words
+        self.malay_words = malay_words
+
+    @property
+    def total_alpha(self) -> int:
+        return self.latin + self.cjk + self.other_alpha
+
+    @property
+    def is_mostly_english(self) -> bool:
+        """Latin-script text (English or Malay) with no CJK at all."""
+        if self.cjk or not self.total_alpha:
+            return False
+        return self.latin / self.total_alpha > 0.5
+
+    @property
+    def is_malay(self) -> bool:
+        return self.malay_words >= 2 and self.malay_words * 10 >= self.words
+
+
+@lru_cache(maxsize=1024)
+def text_profile(text: str) -> TextProfile:
+    """Single pass over text, memoized per string, shared by every language gate."""
+    latin = cjk = other_alpha = non_ascii = words = malay_words = 0
+    word = []
+    for ch in (text or "") + " ":
+        o = ord(ch)
+        if o < 128:
+            if 'a' <= ch <= 'z' or 'A' <= ch <= 'Z':
+                latin += 1
+                word.append(ch)
+                continue
         else:
-            if k in text_lc:
-                return True
-    return False
+            non_ascii += 1
+            if 0x4e00 <= o <= 0x9fff:
+                cjk += 1
+            elif ch.isalpha():
+                other_alpha += 1
+        if word:
+            words += 1
+            if "".join(word).lower() in _MALAY_HINT_WORDS:
+                malay_words += 1
+            word = []
+    return TextProfile(latin, cjk, other_alpha, non_ascii, words, malay_words)
+
+
+def _is_mostly_english(text: str) -> bool:
+    return text_profile(text or "").is_mostly_english
+
+# 政治 (Politics) - keywords
+# Keep this list conservative so that only clearly political / national-level stories
+# are tagged as 政治. Local policy / lifestyle-related items will fall back to 综合.
+_POLITICS_KEYWORDS = [
+    # Elections and parties
+    "election", "elections", "pilihan raya", "pru", "by-election", "prk",
+    "manifesto", "campaign", "kempen", "undi", "voter", "pengundi",
+    "umno", "pas ", "pkr", "dap", "bersatu", "amanah", "gps ",
+    # High-level institutions and positions
+    "parliament", "parlimen", "senate", "senator",
+    "prime minister", "perdana menteri", "pm ", "president", "presiden",
+    "mps", "ahli parlimen", "wakil rakyat",
+    # Laws and constitution
+    "law", "act", "bill", "rang undang-undang", "constitution", "perlembagaan",
+    # Anti-corruption / major scandals
+    "macc", "sprm", "anti-corruption", "rasuah",
+    "shafee", "najib", "jho low", "1mdb"
+]
+
+# 经济 (Economy) - Expanded keywords
+_ECONOMY_KEYWORDS = [
+    "ringgit", "bnm", "gdp", "market", "investment", "budget", "economy", "economic",
+    "bank", "banking", "finance", "financial", "stock", "trading", "currency", "forex",
+    "inflation", "deflation", "interest rate", "loan", "credit", "debt", "revenue",
+    "profit", "loss", "earnings", "quarterly", "annual", "fiscal", "monetary policy",
+    "central bank", "reserve bank", "treasury", "ministry of finance", "kementerian kewangan",
+    "bursa malaysia", "klse", "ftse", "index", "share", "equity", "bond", "sukuk",
+    "ipo", "listing", "merger", "acquisition", "takeover", "dividend", "yield",
+    "retail", "wholesale", "trade", "export", "import", "balance of trade", "current account",
+    "foreign direct investment", "fdi", "portfolio investment", "capital flow",
+    "exchange rate", "usd", "rm", "myr", "yen", "euro", "pound", "singapore dollar",
+    "oil price", "crude oil", "petroleum", "petronas", "palm oil", "commodity",
+    "manufacturing", "industrial", "production", "capacity", "output", "supply chain",
+    "business", "corporate", "enterprise", "sme", "msme", "entrepreneur", "startup",
+    "venture capital", "private equity", "funding", "capital", "investment fund",
+    "pension fund", "epf", "kwsp", "tabung haji", "asb", "unit trust", "mutual fund",
+    "insurance", "takaful", "premium", "claim", "coverage", "policy", "actuarial",
+    "audit", "accounting", "tax", "gst", "sst", "income tax", "corporate tax",
+    "property", "real estate", "housing", "mortgage", "loan", "developer", "construction",
+    "infrastructure", "development", "project", "tender", "contract", "procurement"
+]
+
+# 灾害 (Disaster) - Expanded keywords
+_DISASTER_KEYWORDS = [
+    "flood", "banjir", "earthquake", "gempa", "landslide", "haze", "disaster", "emergency",
+    "storm", "typhoon", "hurricane", "cyclone", "tornado", "thunderstorm", "heavy rain",
+    "drought", "kekeringan", "fire", "kebakaran", "wildfire", "forest fire", "bush fire",
+    "tsunami", "volcano", "gunung berapi", "eruption", "lava", "ash", "smoke",
+    "accident", "kemalangan", "crash", "collision", "explosion", "letupan", "blast",
+    "chemical spill", "oil spill", "contamination", "pollution", "toxic", "hazardous",
+    "evacuation", "pemindahan", "rescue", "penyelamatan", "relief", "bantuan",
+    "emergency response", "crisis", "krisis", "calamity", "catastrophe", "tragedy",
+    "casualty", "fatality", "death", "kematian", "injury", "cedera", "hospital",
+    "red cross", "civil defence", "bomba", "fire department", "police", "military",
+    "warning", "amaran", "alert", "sirene", "siren", "emergency broadcast",
+    "weather warning", "flood warning", "storm warning", "severe weather",
+    "climate change", "global warming", "extreme weather", "natural disaster"
+]
+
+# 体育 (Sports) - Expanded keywords
+_SPORTS_KEYWORDS = [
+    "match", "goal", "badminton", "football", "harimau malaya", "sports", "sukan",
+    "game", "permainan", "tournament", "kejohanan", "championship", "pertandingan",
+    "league", "liga", "cup", "piala", "final", "separuh akhir", "semi final",
+    "olympics", "olimpik", "paralympics", "world cup", "piala dunia", "asian games",
+    "seagames", "southeast asian games", "commonwealth games", "sukan komanwel",
+    "soccer", "tennis", "golf", "basketball", "volleyball", "hockey", "cricket",
+    "swimming", "renang", "athletics", "olahraga", "track and field", "marathon",
+    "cycling", "berbasikal", "motorcycle", "motorsport", "f1", "formula 1", "moto gp",
+    "boxing", "tinju", "martial arts", "seni mempertahankan diri", "karate", "taekwondo",
+    "judo", "wrestling", "gymnastics", "gimnastik", "weightlifting", "angkat berat",
+    "archery", "memanah", "shooting", "menembak", "sailing", "perlayaran", "rowing",
+    "rugby", "baseball", "softball", "squash", "table tennis", "ping pong",
+    "player", "pemain", "athlete", "atlet", "coach", "jurulatih", "team", "pasukan",
+    "score", "markah", "point", "mata", "win", "menang", "lose", "kalah", "draw", "seri",
+    "victory", "kemenangan", "defeat", "kekalahan", "record", "rekod", "achievement",
+    "medal", "pingat", "gold", "emas", "silver", "perak", "bronze", "gangsa",
+    "stadium", "arena", "field", "padang", "court", "gelanggang", "track", "litar"
+]
+
+# 科技 (Technology) - Expanded keywords
+_TECH_KEYWORDS = [
+    "小米", "华为", "红米", "荣耀", "发布", "新品", "参数", "处理器", "相机", "镜头",
+    "ai", "artificial intelligence", "tech", "technology", "startup", "software", "chip", "semiconductor",
+    "digital", "innovation", "smartphone", "mobile", "gadget", "device", "hardware", "app", "application",
+    "computer", "laptop", "desktop", "tablet", "ipad", "iphone", "android", "ios", "windows", "mac",
+    "apple", "samsung", "google", "microsoft", "meta", "facebook", "tesla", "amazon", "netflix", "spotify",
+    "xiaomi", "poco", "huawei", "oneplus", "sony", "lg", "intel", "amd", "nvidia", "qualcomm",
+    "ev", "electric vehicle", "automotive tech", "autonomous", "self-driving", "battery", "charging",
+    "camera", "photography", "drone", "vr", "ar", "virtual reality", "augmented reality",
+    "gaming", "console", "playstation", "xbox", "nintendo", "steam", "streaming", "youtube", "twitch",
+    "fintech", "cryptocurrency", "blockchain", "bitcoin", "ethereum", "nft", "web3",
+    "malaysia tech", "malaysian startup", "e-commerce", "online shopping", "digital payment",
+    "cloud computing", "aws", "azure", "gcp", "server", "database", "api", "developer",
+    "programming", "coding", "python", "javascript", "java", "c++", "react", "node.js",
+    "cybersecurity", "hacking", "privacy", "data protection", "gdpr", "encryption",
+    "iot", "internet of things", "smart home", "wearable", "fitness tracker", "smartwatch",
+    "5g", "6g", "wireless", "bluetooth", "wifi", "network", "internet", "broadband",
+    "robotics", "automation", "ai chatbot", "machine learning", "deep learning", "neural network",
+    "quantum computing", "quantum", "supercomputer", "data center", "server farm",
+    "open source", "github", "git", "version control", "software development", "agile", "devops",
+    "ui", "ux", "user interface", "user experience", "design", "frontend", "backend", "full stack",
+    "mobile app", "app store", "google play", "mobile development",
+    "web development", "website", "html", "css", "bootstrap", "responsive design",
+    "data science", "analytics", "big data", "artificial intelligence", "machine learning",
+    "tech news", "technology news", "tech industry", "silicon valley", "tech giant",
+    "innovation", "disruptive technology", "emerging technology", "cutting edge", "breakthrough",
+    "tech conference", "ces", "wwdc", "google io", "microsoft build", "aws re:invent",
+    "tech review", "product review", "tech comparison", "benchmark", "performance test",
+    "tech tutorial", "how to", "tech guide", "tech tips", "tech tricks", "tech hacks",
+    "tech update", "software update", "firmware update", "security patch", "bug fix",
+    "tech release", "product launch", "new product", "announcement", "unveiling",
+    "tech acquisition", "merger", "partnership", "collaboration", "joint venture",
+    "tech investment", "funding round", "series a", "series b", "ipo", "valuation",
+    "tech startup", "unicorn", "scale-up", "growth", "expansion", "international",
+    "tech talent", "recruitment", "hiring", "job opening", "career", "tech job",
+    "tech education", "coding bootcamp", "online course", "certification", "training",
+    "tech community", "meetup", "conference", "hackathon", "tech event", "networking",
+    "tech blog", "tech article", "tech opinion", "tech analysis", "tech insight",
+    "tech trend", "market trend", "industry trend", "future of tech", "tech prediction",
+    "tech regulation", "tech policy", "tech law", "tech ethics", "tech responsibility",
+    "tech sustainability", "green tech", "clean tech", "renewable energy", "carbon neutral",
+    "tech accessibility", "inclusive design", "tech for good", "social impact", "tech charity",
+    "tech diversity", "inclusion", "equality", "tech for all", "democratizing tech"
+]
+
+# 文娱 / 娱乐 (Entertainment) - Expanded keywords
+_ENTERTAINMENT_KEYWORDS = [
+    "film", "movie", "concert", "celebrity", "艺人", "pelakon", "entertainment", "hiburan",
+    "cinema", "wayang", "theater", "teater", "drama", "drama", "musical", "muzikal",
+    "music", "muzik", "song", "lagu", "singer", "penyanyi", "band", "kumpulan", "artist",
+    "actor", "pelakon", "actress", "pelakon wanita", "director", "pengarah", "producer",
+    "penerbit", "script", "skrip", "screenplay", "story", "cerita", "plot", "plot",
+    "character", "watak", "role", "peranan", "performance", "persembahan", "show",
+    "acara", "program", "program", "series", "siri", "episode", "episod", "season",
+    "musim", "season", "finale", "penamat", "premiere", "tayangan perdana", "release",
+    "keluaran", "box office", "hasil kutipan", "revenue", "pendapatan", "ticket",
+    "tiket", "audience", "penonton", "viewer", "pemirsa", "fan", "peminat", "fandom",
+    "award", "anugerah", "oscar", "grammy", "emmy", "golden globe", "cannes",
+    "festival", "festival", "competition", "pertandingan", "contest", "pertandingan",
+    "reality show", "rancangan realiti", "talent show", "pertandingan bakat", "dance",
+    "tarian", "singing", "nyanyian", "comedy", "komedi", "stand-up", "joke", "lawak",
+    "drama", "drama", "romance", "cinta", "action", "aksi", "horror", "seram",
+    "thriller", "suspense", "mystery", "misteri", "sci-fi", "science fiction",
+    "fantasy", "fantasi", "animation", "animasi", "cartoon", "kartun", "anime",
+    "manga", "comic", "komik", "book", "buku", "novel", "novel", "author", "penulis",
+    "publisher", "penerbit", "magazine", "majalah", "newspaper", "surat khabar",
+    "radio", "radio", "podcast", "podcast", "streaming", "penstriman", "netflix",
+    "disney", "hbo", "amazon prime", "youtube", "tiktok", "instagram", "social media",
+    "media sosial", "influencer", "influencer", "youtuber", "blogger", "vlogger",
+    "fashion", "fesyen", "beauty", "kecantikan", "lifestyle", "gaya hidup", "travel",
+    "pelancongan", "food", "makanan", "restaurant", "restoran", "cooking", "memasak",
+    "recipe", "resipi", "culture", "budaya", "tradition", "tradisi", "festival",
+    "perayaan", "celebration", "sambutan", "party", "parti", "event", "acara",
+    "exhibition", "pameran", "museum", "muzium", "gallery", "galeri", "art",
+    "seni", "painting", "lukisan", "sculpture", "arca", "photography", "fotografi"
+]
+
+# Checked in order of specificity.
+# Tech is checked FIRST because tech articles often mention generic words
+# ("law", "act", "bank", "development") that would otherwise trigger politics/economy.
+# Disaster and sports are clear-cut and checked next. Politics is last among the
+# major categories so that ambiguous words don't shadow tech/economy content.
+CATEGORY_KEYWORDS = [
+    ("科技", _TECH_KEYWORDS),
+    ("灾害", _DISASTER_KEYWORDS),
+    ("体育", _SPORTS_KEYWORDS),
+    ("文娱", _ENTERTAINMENT_KEYWORDS),
+    ("经济", _ECONOMY_KEYWORDS),
+    ("政治", _POLITICS_KEYWORDS),
+]
+
+
+def _build_category_automaton():
+    automaton = KeywordAutomaton()
+    for category, keywords in CATEGORY_KEYWORDS:
+        for kw in keywords:
+            k = kw.lower()
+            # Use word-boundary matching for plain latin words to avoid 'goal' matching 'global'
+            word_boundary = all(('a' <= ch <= 'z') or ch == ' ' for ch in k) and len(k) >= 3
+            # Multi-word phrases are more specific than single generic words
+            weight = 1.0 + 0.5 * (len(k.split()) - 1)
+            automaton.add(k, (category, k, weight), word_boundary)
+    return automaton.build()
+
+
+_CATEGORY_AUTOMATON = _build_category_automaton()
+
+
+def classify_categories(title, text) -> set:
+    """All categories with at least one keyword hit, from one pass over the text."""
+    t = ((title or "") + " " + (text or "")).lower()
+    return {payload[0] for _s, _e, payload in _CATEGORY_AUTOMATON.iter_matches(t)}
+
 
 def classify(title, text):
-    t = (title + " " + text).lower()
-    
-    # 政治 (Politics) - keywords
-    # Keep this list conservative so that only clearly political / national-level stories
-    # are tagged as 政治. Local policy / lifestyle-related items will fall back to 综合.
-    politics_keywords = [
-        # Elections and parties
-        "election", "elections", "pilihan raya", "pru", "by-election", "prk",
-        "manifesto", "campaign", "kempen", "undi", "voter", "pengundi",
-        "umno", "pas ", "pkr", "dap", "bersatu", "amanah", "gps ",
-        # High-level institutions and positions
-        "parliament", "parlimen", "senate", "senator",
-        "prime minister", "perdana menteri", "pm ", "president", "presiden",
-        "mps", "ahli parlimen", "wakil rakyat",
-        # Laws and constitution
-        "law", "act", "bill", "rang undang-undang", "constitution", "perlembagaan",
-        # Anti-corruption / major scandals
-        "macc", "sprm", "anti-corruption", "rasuah",
-        "shafee", "najib", "jho low", "1mdb"
-    ]
-    
-    # 经济 (Economy) - Expanded keywords
-    economy_keywords = [
-        "ringgit", "bnm", "gdp", "market", "investment", "budget", "economy", "economic",
-        "bank", "banking", "finance", "financial", "stock", "trading", "currency", "forex",
-        "inflation", "deflation", "interest rate", "loan", "credit", "debt", "revenue",
-        "profit", "loss", "earnings", "quarterly", "annual", "fiscal", "monetary policy",
-        "central bank", "reserve bank", "treasury", "ministry of finance", "kementerian kewangan",
-        "bursa malaysia", "klse", "ftse", "index", "share", "equity", "bond", "sukuk",
-        "ipo", "listing", "merger", "acquisition", "takeover", "dividend", "yield",
-        "retail", "wholesale", "trade", "export", "import", "balance of trade", "current account",
-        "foreign direct investment", "fdi", "portfolio investment", "capital flow",
-        "exchange rate", "usd", "rm", "myr", "yen", "euro", "pound", "singapore dollar",
-        "oil price", "crude oil", "petroleum", "petronas", "palm oil", "commodity",
-        "manufacturing", "industrial", "production", "capacity", "output", "supply chain",
-        "business", "corporate", "enterprise", "sme", "msme", "entrepreneur", "startup",
-        "venture capital", "private equity", "funding", "capital", "investment fund",
-        "pension fund", "epf", "kwsp", "tabung haji", "asb", "unit trust", "mutual fund",
-        "insurance", "takaful", "premium", "claim", "coverage", "policy", "actuarial",
-        "audit", "accounting", "tax", "gst", "sst", "income tax", "corporate tax",
-        "property", "real estate", "housing", "mortgage", "loan", "developer", "construction",
-        "infrastructure", "development", "project", "tender", "contract", "procurement"
-    ]
-    
-    # 灾害 (Disaster) - Expanded keywords
-    disaster_keywords = [
-        "flood", "banjir", "earthquake", "gempa", "landslide", "haze", "disaster", "emergency",
-        "storm", "typhoon", "hurricane", "cyclone", "tornado", "thunderstorm", "heavy rain",
-        "drought", "kekeringan", "fire", "kebakaran", "wildfire", "forest fire", "bush fire",
-        "tsunami", "volcano", "gunung berapi", "eruption", "lava", "ash", "smoke",
-        "accident", "kemalangan", "crash", "collision", "explosion", "letupan", "blast",
-        "chemical spill", "oil spill", "contamination", "pollution", "toxic", "hazardous",
-        "evacuation", "pemindahan", "rescue", "penyelamatan", "relief", "bantuan",
-        "emergency response", "crisis", "krisis", "calamity", "catastrophe", "tragedy",
-        "casualty", "fatality", "death", "kematian", "injury", "cedera", "hospital",
-        "red cross", "civil defence", "bomba", "fire department", "police", "military",
-        "warning", "amaran", "alert", "sirene", "siren", "emergency broadcast",
-        "weather warning", "flood warning", "storm warning", "severe weather",
-        "climate change", "global warming", "extreme weather", "natural disaster"
-    ]
-    
-    # 体育 (Sports) - Expanded keywords
-    sports_keywords = [
-        "match", "goal", "badminton", "football", "harimau malaya", "sports", "sukan",
-        "game", "permainan", "tournament", "kejohanan", "championship", "pertandingan",
-        "league", "liga", "cup", "piala", "final", "separuh akhir", "semi final",
-        "olympics", "olimpik", "paralympics", "world cup", "piala dunia", "asian games",
-        "seagames", "southeast asian games", "commonwealth games", "sukan komanwel",
-        "soccer", "tennis", "golf", "basketball", "volleyball", "hockey", "cricket",
-        "swimming", "renang", "athletics", "olahraga", "track and field", "marathon",
-        "cycling", "berbasikal", "motorcycle", "motorsport", "f1", "formula 1", "moto gp",
-        "boxing", "tinju", "martial arts", "seni mempertahankan diri", "karate", "taekwondo",
-        "judo", "wrestling", "gymnastics", "gimnastik", "weightlifting", "angkat berat",
-        "archery", "memanah", "shooting", "menembak", "sailing", "perlayaran", "rowing",
-        "rugby", "baseball", "softball", "squash", "table tennis", "ping pong",
-        "player", "pemain", "athlete", "atlet", "coach", "jurulatih", "team", "pasukan",
-        "score", "markah", "point", "mata", "win", "menang", "lose", "kalah", "draw", "seri",
-        "victory", "kemenangan", "defeat", "kekalahan", "record", "rekod", "achievement",
-        "medal", "pingat", "gold", "emas", "silver", "perak", "bronze", "gangsa",
-        "stadium", "arena", "field", "padang", "court", "gelanggang", "track", "litar"
-    ]
-    
-    # 科技 (Technology) - Expanded keywords
-    tech_keywords = [
-        "小米", "华为", "红米", "荣耀", "发布", "新品", "参数", "处理器", "相机", "镜头",
-        "ai", "artificial intelligence", "tech", "technology", "startup", "software", "chip", "semiconductor",
-        "digital", "innovation", "smartphone", "mobile", "gadget", "device", "hardware", "app", "application",
-        "computer", "laptop", "desktop", "tablet", "ipad", "iphone", "android", "ios", "windows", "mac",
-        "apple", "samsung", "google", "microsoft", "meta", "facebook", "tesla", "amazon", "netflix", "spotify",
-        "xiaomi", "poco", "huawei", "oneplus", "sony", "lg", "intel", "amd", "nvidia", "qualcomm",
-        "ev", "electric vehicle", "automotive tech", "autonomous", "self-driving", "battery", "charging",
-        "camera", "photography", "drone", "vr", "ar", "virtual reality", "augmented reality",
-        "gaming", "console", "playstation", "xbox", "nintendo", "steam", "streaming", "youtube", "twitch",
-        "fintech", "cryptocurrency", "blockchain", "bitcoin", "ethereum", "nft", "web3",
-        "malaysia tech", "malaysian startup", "e-commerce", "online shopping", "digital payment",
-        "cloud computing", "aws", "azure", "gcp", "server", "database", "api", "developer",
-        "programming", "coding", "python", "javascript", "java", "c++", "react", "node.js",
-        "cybersecurity", "hacking", "privacy", "data protection", "gdpr", "encryption",
-        "iot", "internet of things", "smart home", "wearable", "fitness tracker", "smartwatch",
-        "5g", "6g", "wireless", "bluetooth", "wifi", "network", "internet", "broadband",
-        "robotics", "automation", "ai chatbot", "machine learning", "deep learning", "neural network",
-        "quantum computing", "quantum", "supercomputer", "data center", "server farm",
-        "open source", "github", "git", "version control", "software development", "agile", "devops",
-        "ui", "ux", "user interface", "user experience", "design", "frontend", "backend", "full stack",
-        "mobile app", "app store", "google play", "mobile development",
-        "web development", "website", "html", "css", "bootstrap", "responsive design",
-        "data science", "analytics", "big data", "artificial intelligence", "machine learning",
-        "tech news", "technology news", "tech industry", "silicon valley", "tech giant",
-        "innovation", "disruptive technology", "emerging technology", "cutting edge", "breakthrough",
-        "tech conference", "ces", "wwdc", "google io", "microsoft build", "aws re:invent",
-        "tech review", "product review", "tech comparison", "benchmark", "performance test",
-        "tech tutorial", "how to", "tech guide", "tech tips", "tech tricks", "tech hacks",
-        "tech update", "software update", "firmware update", "security patch", "bug fix",
-        "tech release", "product launch", "new product", "announcement", "unveiling",
-        "tech acquisition", "merger", "partnership", "collaboration", "joint venture",
-        "tech investment", "funding round", "series a", "series b", "ipo", "valuation",
-        "tech startup", "unicorn", "scale-up", "growth", "expansion", "international",
-        "tech talent", "recruitment", "hiring", "job opening", "career", "tech job",
-        "tech education", "coding bootcamp", "online course", "certification", "training",
-        "tech community", "meetup", "conference", "hackathon", "tech event", "networking",
-        "tech blog", "tech article", "tech opinion", "tech analysis", "tech insight",
-        "tech trend", "market trend", "industry trend", "future of tech", "tech prediction",
-        "tech regulation", "tech policy", "tech law", "tech ethics", "tech responsibility",
-        "tech sustainability", "green tech", "clean tech", "renewable energy", "carbon neutral",
-        "tech accessibility", "inclusive design", "tech for good", "social impact", "tech charity",
-        "tech diversity", "inclusion", "equality", "tech for all", "democratizing tech"
-    ]
-    
-    # 文娱 / 娱乐 (Entertainment) - Expanded keywords
-    entertainment_keywords = [
-        "film", "movie", "concert", "celebrity", "艺人", "pelakon", "entertainment", "hiburan",
-        "cinema", "wayang", "theater", "teater", "drama", "drama", "musical", "muzikal",
-        "music", "muzik", "song", "lagu", "singer", "penyanyi", "band", "kumpulan", "artist",
-        "actor", "pelakon", "actress", "pelakon wanita", "director", "pengarah", "producer",
-        "penerbit", "script", "skrip", "screenplay", "story", "cerita", "plot", "plot",
-        "character", "watak", "role", "peranan", "performance", "persembahan", "show",
-        "acara", "program", "program", "series", "siri", "episode", "episod", "season",
-        "musim", "season", "finale", "penamat", "premiere", "tayangan perdana", "release",
-        "keluaran", "box office", "hasil kutipan", "revenue", "pendapatan", "ticket",
-        "tiket", "audience", "penonton", "viewer", "pemirsa", "fan", "peminat", "fandom",
-        "award", "anugerah", "oscar", "grammy", "emmy", "golden globe", "cannes",
-        "festival", "festival", "competition", "pertandingan", "contest", "pertandingan",
-        "reality show", "rancangan realiti", "talent show", "pertandingan bakat", "dance",
-        "tarian", "singing", "nyanyian", "comedy", "komedi", "stand-up", "joke", "lawak",
-        "drama", "drama", "romance", "cinta", "action", "aksi", "horror", "seram",
-        "thriller", "suspense", "mystery", "misteri", "sci-fi", "science fiction",
-        "fantasy", "fantasi", "animation", "animasi", "cartoon", "kartun", "anime",
-        "manga", "comic", "komik", "book", "buku", "novel", "novel", "author", "penulis",
-        "publisher", "penerbit", "magazine", "majalah", "newspaper", "surat khabar",
-        "radio", "radio", "podcast", "podcast", "streaming", "penstriman", "netflix",
-        "disney", "hbo", "amazon prime", "youtube", "tiktok", "instagram", "social media",
-        "media sosial", "influencer", "influencer", "youtuber", "blogger", "vlogger",
-        "fashion", "fesyen", "beauty", "kecantikan", "lifestyle", "gaya hidup", "travel",
-        "pelancongan", "food", "makanan", "restaurant", "restoran", "cooking", "memasak",
-        "recipe", "resipi", "culture", "budaya", "tradition", "tradisi", "festival",
-        "perayaan", "celebration", "sambutan", "party", "parti", "event", "acara",
-        "exhibition", "pameran", "museum", "muzium", "gallery", "galeri", "art",
-        "seni", "painting", "lukisan", "sculpture", "arca", "photography", "fotografi"
-    ]
-    
-    # Check categories in order of specificity.
-    # Tech is checked FIRST because tech articles often mention generic words
-    # ("law", "act", "bank", "development") that would otherwise trigger politics/economy.
-    # Disaster and sports are clear-cut and checked next. Politics is last among the
-    # major categories so that ambiguous words don't shadow tech/economy content.
-    if _contains_kw(t, tech_keywords): return "科技"
-    if _contains_kw(t, disaster_keywords): return "灾害"
-    if _contains_kw(t, sports_keywords): return "体育"
-    if _contains_kw(t, entertainment_keywords): return "文娱"
-    if _contains_kw(t, economy_keywords): return "经济"
-    if _contains_kw(t, politics_keywords): return "政治"
+    hits = classify_categories(title, text)
+    for category, _keywords in CATEGORY_KEYWORDS:
+        if category in hits:
+            return category
     return "综合"
 
+
+# Keyword hits in the title count this many times more than hits in the body.
+CLASSIFY_TITLE_WEIGHT = 2.0
+
+
+def classify_batch(items):
+    """Score every category for a list of items in one automaton pass each.
+
+    Each distinct keyword counts once per item with its phrase weight (title
+    hits weighted by CLASSIFY_TITLE_WEIGHT). Returns one dict per item:
+      {"category": best category or "综合", "confidence": best / total score,
+       "scores": {category: score}}
+    Unlike classify(), which returns the first category in priority order
+    with any hit, this picks the highest-scoring one (priority breaks ties).
+    """
+    order = {category: i for i, (category, _kw) in enumerate(CATEGORY_KEYWORDS)}
+    results = []
+    for it in items:
+        title = (it.get("title") or "").lower()
+        text = f"{title}\n{(it.get('body') or '').lower()}"
+        title_end = len(title)
+        best_hit = {}
+        for start, _end, (category, kw, weight) in _CATEGORY_AUTOMATON.iter_matches(text):
+            w = weight * (CLASSIFY_TITLE_WEIGHT if start < title_end else 1.0)
+            if w > best_hit.get((category, kw), 0.0):
+                best_hit[(category, kw)] = w
+        scores = {}
+        for (category, _kw), w in best_hit.items():
+            scores[category] = scores.get(category, 0.0) + w
+        total = sum(scores.values())
+        if total:
+            category = max(scores, key=lambda c: (scores[c], -order[c]))
+            confidence = scores[category] / total
+        else:
+            category, confidence = "综合", 0.0
+        results.append({"category": category, "confidence": round(confidence, 3), "scores": scores})
+    return results
+
+
+# Categories to drop before any fetch/LLM work, e.g. "体育,文娱" (default: none).
+SKIP_CATEGORIES = {c.strip() for c in os.environ.get("SKIP_CATEGORIES", "").split(",") if c.strip()}
+
+# Only drop an item when classify_batch is at least this confident.
+try:
+    SKIP_CATEGORY_MIN_CONFIDENCE = float(os.environ.get("SKIP_CATEGORY_MIN_CONFIDENCE", "0.6"))
+except Exception:
+    SKIP_CATEGORY_MIN_CONFIDENCE = 0.6
+
+
+def tag_and_filter_items(items):
+    """Tag each item with category_hint/category_confidence via classify_batch
+    and drop confidently-classified items in SKIP_CATEGORIES."""
+    if not items:
+        return items
+    kept = []
+    dropped = 0
+    for it, res in zip(items, classify_batch(items)):
+        it["category_hint"] = res["category"]
+        it["category_confidence"] = res["confidence"]
+        if res["category"] in SKIP_CATEGORIES and res["confidence"] >= SKIP_CATEGORY_MIN_CONFIDENCE:
+            dropped += 1
+            continue
+        kept.append(it)
+    if dropped:
+        print(f"🧹 Category filter removed {dropped} item(s) in {sorted(SKIP_CATEGORIES)}; {len(kept)} remain")
+    return kept
+
 def summarize(title, body):
     text = body or title
     text = text[:320]
@@ -2409,6 +4803,7 @@ def collect_once():
 
                 items.append({
                     "title": title,
+                    "orig_title": title,
                     "url": resolved_link,
                     "body": body,
                     "source": source_name,
@@ -2498,6 +4893,9 @@ def main():
     sent_news_urls = load_sent_news()
     # Load story-level dedup index (titles of stories pushed within DEDUP_WINDOW_HOURS)
     sent_stories = load_sent_stories()
+    story_simhashes = SimHashIndex()
+    for rec in sent_stories:
+        story_simhashes.add(rec.get("simhash") or 0, rec)
     print(f"🧠 Story-similarity dedup: threshold={SIM_TITLE_THRESHOLD}, window={DEDUP_WINDOW_HOURS}h")
     
     # Leader election mechanism to prevent duplicate news from multiple machines
@@ -2606,16 +5004,49 @@ def main():
     
     print("  ✅ This machine is now the leader!")
     
+    def _upcoming(candidates, limit=None):
+        """Candidates the prepare stage / look-ahead may summarize ahead of their turn.
+        With limit, only the first `limit` sendable candidates are considered;
+        priority items among them count towards it but are left to the send loop."""
+        out, seen = [], 0
+        for it in candidates:
+            if limit is not None and seen >= limit:
+                break
+            if is_news_already_sent(it['url'], sent_news_urls):
+                continue
+            if is_similar_to_sent(it.get('orig_title') or it.get('title', ''), sent_stories):
+                continue
+            seen += 1
+            if not it.get("priority"):
+                out.append(it)
+        return out
+
+    carried = []  # candidates the previous cycle did not reach
     while True:
         try:
             sent = 0
+            _CALL_CONTEXT.deadline = None
+            LOOKAHEAD.join()
             print(f"=== Starting collection cycle ===")
             items = collect_once()
             print(f"=== Found {len(items)} total items ===")
+            if carried:
+                try:
+                    recent_hours = int(os.environ.get("RECENT_NEWS_HOURS", "6"))
+                except Exception:
+                    recent_hours = 6
+                fresh_urls = {it['url'] for it in items}
+                carried = [
+                    it for it in carried
+                    if it['url'] not in fresh_urls and is_recent_news(it.get("published_at", ""), hours=recent_hours)
+                ]
+                if carried:
+                    print(f"📥 Carried over {len(carried)} candidate(s) from the previous cycle")
+                items = carried + items
+                carried = []
             # Sort by brand keywords first (highest priority), then priority feeds, then by published_at (latest first)
             def _k(it):
-                title = it.get("title", "") or ""
-                has_brand = 1 if has_brand_keywords(title) else 0
+                has_brand = 1 if item_entities(it).has_xiaomi_keyword else 0
                 priority = 1 if it.get("priority") else 0
                 published_at = it.get("published_at") or "1970-01-01T00:00:00"
                 return (has_brand, priority, published_at)
@@ -2623,20 +5054,40 @@ def main():
             # Collapse near-duplicate items within this fetch round so we don't queue
             # 5 versions of the same story for the next 5 cycles.
             items = dedup_batch(items)
+            # Cheap keyword tagging of every candidate before any fetch/LLM spend
+            items = tag_and_filter_items(items)
             
             # Count brand-related news
-            brand_news_count = sum(1 for it in items if has_brand_keywords(it.get("title", "")))
+            brand_news_count = sum(1 for it in items if item_entities(it).has_xiaomi_keyword)
             if brand_news_count > 0:
                 print(f"🏷️  Found {brand_news_count} brand-related news items (Xiaomi/REDMI/POCO/mijia) - prioritized!")
             
             # Log the top 10 most recent items for verification
             print(f"=== Top 10 most recent news items ===")
             for i, item in enumerate(items[:10]):
-                brand_marker = " [BRAND]" if has_brand_keywords(item.get("title", "")) else ""
-                print(f"{i+1}. {item['title'][:60]}...{brand_marker} (Published: {item.get('published_at', 'No date')})")
+                brand_marker = " [BRAND]" if item_entities(item).has_xiaomi_keyword else ""
+                print(f"{i+1}. {item['title'][:60]}...{brand_marker} [{item.get('category_hint', '')} {item.get('category_confidence', 0):.2f}] (Published: {item.get('published_at', 'No date')})")
             
+            # Prepare stage: fetch and summarize the next MAX_PER_CYCLE eligible
+            # items on the summary pool (concurrently and batched when there are
+            # several) before the per-item send loop. Priority items in that
+            # window are left to the loop, so nothing past the budget is paid for.
+            if use_ai and (LLM_BATCH_SIZE > 1 or SUMMARY_WORKERS > 1):
+                batch_candidates = [
+                    it for it in _upcoming(items, limit=MAX_PER_CYCLE) if "_ai_result" not in it
+                ]
+                if batch_candidates:
+                    prepare_ai_summaries(batch_candidates, story_simhashes)
+
             # Process items and skip already sent news
-            for it in items:
+            next_idx = 0
+            for idx, it in enumerate(items):
+                next_idx = idx + 1
+                # A background look-ahead job may still be preparing this item
+                LOOKAHEAD.wait_for(it)
+                # Per-item time budget: fetch, LLM and send stages clamp their
+                # timeouts to it and degrade (skip AMP, regeneration, cover) once spent
+                _CALL_CONTEXT.deadline = Deadline(ITEM_DEADLINE_SEC)
                 # Check if this news has already been sent
                 if is_news_already_sent(it['url'], sent_news_urls):
                     print(f"⏭️  Skipping already sent news: {it['title'][:50]}...")
@@ -2644,7 +5095,7 @@ def main():
 
                 # Cross-source story-level dedup: skip if a similar story was
                 # already pushed within the dedup window, even if the URL differs.
-                sim_match = is_similar_to_sent(it.get('title', ''), sent_stories)
+                sim_match = is_similar_to_sent(it.get('orig_title') or it.get('title', ''), sent_stories)
                 if sim_match:
                     print(
                         f"⏭️  Skipping similar story (already pushed): "
@@ -2655,7 +5106,7 @@ def main():
                     continue
 
                 # Log brand-related news priority
-                if has_brand_keywords(it.get("title", "")):
+                if item_entities(it).has_xiaomi_keyword:
                     print(f"🏷️  Processing brand-related news (priority): {it['title'][:60]}...")
 
                 # For priority sources, also generate Chinese summary via AI (MiMo/Gemini)
@@ -2665,7 +5116,10 @@ def main():
                     summary = it["body"] or it["title"]
                     if use_ai:
                         try:
-                            chinese_title, ai_summary, ai_provider_used = ai_summarize_from_url(it["title"], it['url'])
+                            cached = cached_story_summary(it)
+                            chinese_title, ai_summary, ai_provider_used = cached or ai_summarize_from_url(it["title"], it['url'])
+                            if not cached and _is_valid_ai_result(it["title"], chinese_title, ai_summary):
+                                STORY_CLUSTERS.put(it, chinese_title, ai_summary, ai_provider_used)
                             if chinese_title:
                                 it["title"] = chinese_title
                                 print(f"  🏷️  AI-generated Chinese title (priority): {chinese_title[:40]}...")
@@ -2684,9 +5138,25 @@ def main():
                     print(f"  🔗 Source URL: {it['url']}")
                     print(f"  📰 Original title: {it['title']}")
                     
-                    # Extract content from the actual source URL (not Google News)
-                    article_content = read_article_content(it['url'])
+                    # Extract content from the actual source URL (not Google News),
+                    # unless the batch stage already fetched it
+                    if "_article_content" in it:
+                        article_content = it.pop("_article_content")
+                    else:
+                        article_content = read_article_content(it['url'])
                     it["_fetched_article_text"] = article_content if (article_content and len(article_content) > 100) else None
+
+                    # Body-level dedup: same story under a different headline
+                    it["_simhash"] = _simhash64(article_content)
+                    body_match = story_simhashes.find(it["_simhash"])
+                    if body_match:
+                        print(
+                            f"⏭️  Skipping near-duplicate article body (already pushed): "
+                            f"{(it.get('title') or '')[:50]}  ⟵  "
+                            f"{(body_match.get('title') or '')[:50]} "
+                            f"({body_match.get('source','')})"
+                        )
+                        continue
                     
                     if article_content and len(article_content) > 100:
                         print(f"  📖 Article content extracted: {len(article_content)} characters")
@@ -2694,7 +5164,14 @@ def main():
                         
                         # Use AI (MiMo/Gemini) to summarize the actual article content
                         try:
-                            chinese_title, summary, ai_provider_used = ai_summarize_content(it["title"], article_content)
+                            prepared = it.pop("_ai_result", None)
+                            if prepared:
+                                print(f"  📦 Using batch summary from {prepared[2]}")
+                            else:
+                                prepared = cached_story_summary(it, it["_simhash"])
+                            chinese_title, summary, ai_provider_used = prepared or ai_summarize_content(it["title"], article_content)
+                            if not prepared and _is_valid_ai_result(it["title"], chinese_title, summary):
+                                STORY_CLUSTERS.put(it, chinese_title, summary, ai_provider_used, it["_simhash"])
                             
                             # Validate that we got meaningful content
                             if not chinese_title or chinese_title.strip() in ["【分类】中文标题", "中文标题", ""]:
@@ -2737,7 +5214,14 @@ def main():
                             print(f"  ⚠️  RSS body too short/empty, generating summary from title only")
                         
                         try:
-                            chinese_title, summary, ai_provider_used = ai_summarize_content(it["title"], rss_content)
+                            cached = cached_story_summary(it)
+                            if cached:
+                                chinese_title, summary, ai_provider_used = cached
+                            else:
+                                with _llm_prompt_kind("rss"):
+                                    chinese_title, summary, ai_provider_used = ai_summarize_content(it["title"], rss_content)
+                            if not cached and _is_valid_ai_result(it["title"], chinese_title, summary):
+                                STORY_CLUSTERS.put(it, chinese_title, summary, ai_provider_used)
                             
                             # Validate that we got meaningful content
                             if not chinese_title or chinese_title.strip() in ["【分类】中文标题", "中文标题", ""]:
@@ -2764,7 +5248,7 @@ def main():
                     summary = summarize(it["title"], it["body"])
                 
                 # If summary still looks English and AI is enabled, try to regenerate in Chinese
-                if use_ai and _is_mostly_english(summary):
+                if use_ai and _is_mostly_english(summary) and not _deadline_expired():
                     try:
                         print(f"  🔁 Summary looks English; regenerating with AI in Chinese")
                         chinese_title, cn_summary, ai_provider_used = ai_summarize_from_url(it["title"], it['url'])
@@ -2782,6 +5266,7 @@ def main():
 
                 if (
                     use_ai
+                    and not _deadline_expired()
                     and summary
                     and not _is_mostly_english(summary)
                     and _title_headline_is_mostly_english(it["title"])
@@ -2804,15 +5289,18 @@ def main():
                     it["title"] = f"【科技】{it['title']}"
                 
                 # Force Chinese output for any remaining English content
-                if not it["title"].startswith("【") and not any(ord(c) > 127 for c in it["title"]):
+                if not it["title"].startswith("【") and not text_profile(it["title"]).non_ascii:
                     print(f"  🔄 Forcing Chinese title for English content")
                     it["title"] = f"【综合】{it['title']}"
                 
                 # More aggressive English detection for summary
-                if (not any(ord(c) > 127 for c in summary) and len(summary) > 20) or _is_mostly_english(summary):
-                    print(f"  🔄 Forcing Chinese summary for English content")
-                    # Extract key English words and create a Chinese summary
-                    english_words = [word for word in summary.split() if word.isalpha() and len(word) > 3][:3]
+                summary_profile = text_profile(summary)
+                if (not summary_profile.non_ascii and len(summary) > 20) or summary_profile.is_mostly_english:
+                    print(f"  🔄 Forcing Chinese summary for {'Malay' if summary_profile.is_malay else 'English'} content")
+                    # Extract key words (Malay function words are not topics) and create a Chinese summary
+                    skip = _MALAY_HINT_WORDS if summary_profile.is_malay else ()
+                    english_words = [word for word in summary.split()
+                                     if word.isalpha() and len(word) > 3 and word.lower() not in skip][:3]
                     if english_words:
                         summary = f"根据{it['title']}的报道，这是一条关于{', '.join(english_words)}的重要新闻。详细内容请查看原文链接。"
                     else:
@@ -2823,6 +5311,12 @@ def main():
                     print(f"  ⚠️  Summary too short, enhancing with more details")
                     summary = f"根据{it['title']}的报道，这是一条重要的科技新闻。详细内容请查看原文链接。"
                 
+                # Grounding check: every number in the summary should come from the article
+                source_text = it.get("_fetched_article_text")
+                if use_ai and source_text:
+                    summary = _apply_chinese_name_map(
+                        _ground_summary_numbers(ai_provider_used, it["title"], summary, source_text))
+
                 print(f"  ✅ Final content validation:")
                 print(f"    Title: {it['title']}")
                 print(f"    Summary: {summary[:100]}...")
@@ -2864,6 +5358,9 @@ def main():
                 # Keep the item title in sync with the final title we actually send,
                 # so logs, Feishu card and Bitable all use the same category label.
                 it["title"] = title
+                # Store the final (post-regeneration) result for the story cluster
+                if it.get("_cluster_id"):
+                    STORY_CLUSTERS.put(it, title, summary, ai_provider_used, it.get("_simhash", 0))
                 
                 # No extra required keyword; use the generated title as-is
                 
@@ -3005,15 +5502,12 @@ def main():
                     # this after a successful send so that failed pushes can be
                     # retried with a different source on the next cycle.
                     try:
-                        append_sent_story(it.get('url', ''), it.get('title', ''), it.get('source', ''))
-                        sent_stories.append({
-                            "ts": int(time.time()),
-                            "url": it.get('url', ''),
-                            "title": it.get('title', ''),
-                            "title_key": _norm_title_key(it.get('title', '')),
-                            "source": it.get('source', ''),
-                            "_sig": _story_signature(it.get('title', '')),
-                        })
+                        story_rec = append_sent_story(
+                            it.get('url', ''), it.get('title', ''), it.get('source', ''),
+                            it.get('_simhash', 0), it.get('orig_title', ''),
+                        )
+                        sent_stories.append(story_rec)
+                        story_simhashes.add(story_rec["simhash"], story_rec)
                     except Exception as e:
                         print(f"  ⚠️  Failed to record sent story for similarity dedup: {e}")
                     print(f"✅ Sent news: {it['title'][:50]}...")
@@ -3023,14 +5517,27 @@ def main():
                 if sent >= MAX_PER_CYCLE:
                     print(f"Reached MAX_PER_CYCLE={MAX_PER_CYCLE}, stop sending this round.")
                     break
+                # Prepare the next candidates while we wait between pushes
+                if use_ai:
+                    LOOKAHEAD.start(_upcoming(items[next_idx:]), story_simhashes, MAX_PER_CYCLE - sent)
                 time.sleep(SEND_INTERVAL_SEC)
             
+            _CALL_CONTEXT.deadline = None
+            LLM_TELEMETRY.export(snap=LLM_TELEMETRY.log_summary())
+            # Keep the candidates this cycle did not reach; SEEN stops
+            # collect_once() from returning them again.
+            carried = [
+                it for it in items[next_idx:]
+                if not is_news_already_sent(it['url'], sent_news_urls)
+            ][:max(0, LOOKAHEAD_CARRY_MAX)]
             # Save sent news URLs to file after each cycle
             save_sent_news(sent_news_urls)
             
         except Exception as e:
             print(f"loop_error: {e}")
         if ONE_SHOT:
+            # Nothing survives the process: don't let a look-ahead job keep paying for items
+            LOOKAHEAD.shutdown()
             break
         # Update leader heartbeat
         try:
@@ -3055,6 +5562,9 @@ def main():
             loop_sleep = int(os.environ.get("COLLECT_INTERVAL_SEC", "600"))
         except Exception:
             loop_sleep = 600
+        # Summarize the carried-over candidates while we wait for the next cycle
+        if use_ai and carried and not ONE_SHOT:
+            LOOKAHEAD.start(_upcoming(carried), story_simhashes, MAX_PER_CYCLE)
         print(f"⏳ Sleeping {loop_sleep}s before next cycle...")
         time.sleep(loop_sleep)
 
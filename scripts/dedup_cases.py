@@ -0,0 +1,48 @@
+"""Regression cases for the title dedup fingerprint (_fingerprints_match).
+
+Each case is (sent original title, sent LLM title, candidate title, expected
+duplicate?). Same-product, different-story headlines must NOT match; the
+same story under another headline must. Run from the repo root:
+
+    python scripts/dedup_cases.py
+
+Exits non-zero if any case fails.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import adailocal  # noqa: E402
+
+S25_SENT = ("Samsung Galaxy S25 Ultra now on sale in Malaysia for RM5,999",
+            "【科技】三星Galaxy S25 Ultra在马来西亚开售，售价RM5,999")
+
+CASES = [
+    (*S25_SENT, "Samsung Galaxy S25 Ultra review", False),
+    (*S25_SENT, "Samsung Galaxy S25 Ultra gets One UI 8 update", False),
+    (*S25_SENT, "Xiaomi 15 Ultra vs Samsung Galaxy S25 Ultra camera comparison", False),
+    (*S25_SENT, "Samsung Galaxy S25 Ultra: 5 hidden features", False),
+    (*S25_SENT, "Samsung Galaxy S25 Ultra launched in Malaysia, priced at RM5,999", True),
+    (*S25_SENT, "Galaxy S25 Ultra goes on sale in Malaysia at RM5,999", True),
+    ("Petronas posts RM12.3 billion profit in Q3, up 15%", "【经济】国油第三季净利123亿令吉，增长15%",
+     "Petronas Q3 net profit rises 15% to RM12.3 billion", True),
+    ("Petronas posts RM12.3 billion profit in Q3, up 15%", "【经济】国油第三季净利123亿令吉，增长15%",
+     "Petronas appoints new CEO", False),
+]
+
+
+def main():
+    failed = 0
+    for orig, sent_title, candidate, expected in CASES:
+        rec = adailocal._with_story_sigs({"title": sent_title, "orig_title": orig, "ts": 0})
+        got = bool(adailocal._fingerprints_match(adailocal._entity_fingerprint(candidate), rec["_fp"]))
+        ok = got == expected
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} expected={expected!s:5} got={got!s:5} {candidate}")
+    print(f"{len(CASES) - failed}/{len(CASES)} cases passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
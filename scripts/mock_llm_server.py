@@ -0,0 +1,279 @@
+"""Local OpenAI-compatible mock of the MiMo chat completions API.
+
+Serves POST /chat/completions (and /v1/chat/completions) with replies in the
+formats adailocal.py parses, so the summarization pipeline can be benchmarked
+offline without spending quota:
+
+    python scripts/mock_llm_server.py --port 8808 --latency-ms 1500 --rate-429 0.05
+    MIMO_API_KEY=mock MIMO_API_BASE=http://127.0.0.1:8808/v1 USE_AI_SUMMARY=1 ONE_SHOT=1 python adailocal.py
+
+The reply shape follows the prompt: batch prompts get a JSON array, title-only
+regeneration gets one "标题:" line, summary repair gets one "摘要:" line, and
+summary prompts get a JSON object or "标题:/摘要:" lines (--format forces one).
+Latency, 429s (with Retry-After), 500s and malformed outputs are drawn from a
+seeded RNG so runs are reproducible. Requests with "stream": true get the reply
+as Server-Sent Events in --chunk-chars pieces every --chunk-ms; clients that
+hang up early are counted as "client_closed". GET /stats returns the counters.
+
+Standard library only.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIES = ("科技", "娱乐", "经济", "体育", "灾难", "政治", "综合")
+MALFORMED_KINDS = ("english", "missing_summary", "truncated", "empty", "chatter", "placeholder", "runaway")
+
+_ARTICLE_TITLE_RE = re.compile(r"文章标题:\s*(.+)")
+
+
+class MockLLM:
+    """Draws latency / failure decisions and builds reply texts."""
+
+    def __init__(self, args):
+        self.args = args
+        self._rng = random.Random(args.seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "429": 0, "500": 0, "malformed": 0, "streamed": 0,
+                      "client_closed": 0, "by_kind": {}}
+
+    def _draw(self):
+        """(latency seconds, status, malformed kind or None) for one request."""
+        a = self.args
+        with self._lock:
+            base = a.latency_ms / 1000.0
+            if a.latency_dist == "fixed":
+                latency = base
+            elif a.latency_dist == "uniform":
+                latency = self._rng.uniform(base * (1 - a.jitter), base * (1 + a.jitter))
+            elif a.latency_dist == "exponential":
+                latency = self._rng.expovariate(1.0 / base) if base > 0 else 0.0
+            else:  # lognormal with median latency_ms
+                latency = self._rng.lognormvariate(math.log(base), a.sigma) if base > 0 else 0.0
+            if self._rng.random() < a.tail_rate:
+                latency += a.tail_ms / 1000.0
+            roll = self._rng.random()
+            if roll < a.rate_429:
+                status = 429
+            elif roll < a.rate_429 + a.rate_500:
+                status = 500
+            else:
+                status = 200
+            malformed = self._rng.choice(MALFORMED_KINDS) if self._rng.random() < a.malformed_rate else None
+        return max(0.0, latency), status, malformed
+
+    def _count(self, key, kind=None):
+        with self._lock:
+            self.stats[key] += 1
+            if kind:
+                self.stats["by_kind"][kind] = self.stats["by_kind"].get(kind, 0) + 1
+
+    @staticmethod
+    def prompt_kind(prompt: str) -> str:
+        if "JSON数组" in prompt:
+            return "batch"
+        if "只重新写一条中文标题" in prompt:
+            return "title"
+        if "格式：摘要:" in prompt:
+            return "repair"
+        if '"summary"' in prompt and '"title"' in prompt:
+            return "json"
+        return "lines"
+
+    @staticmethod
+    def _story(text: str, n: int = 0):
+        """Deterministic Chinese (title headline, category, summary) for a piece of text."""
+        h = hashlib.sha1(f"{n}:{text}".encode("utf-8")).hexdigest()
+        category = CATEGORIES[int(h[:2], 16) % len(CATEGORIES)]
+        headline = f"模拟新闻标题{h[:6]}"
+        summary = f"这是本地模拟服务器生成的中文摘要，编号{h[:6]}。内容仅用于离线测试摘要流程的吞吐量、重试和尾部延迟。"
+        return headline, category, summary
+
+    def reply(self, prompt: str, kind: str, malformed):
+        titles = _ARTICLE_TITLE_RE.findall(prompt) or [prompt[:200]]
+        if malformed == "empty":
+            return ""
+        if malformed == "english":
+            return "Title: Mock headline in English\nSummary: This mock summary was written in English on purpose."
+        if malformed == "chatter":
+            return "好的，下面是我对这篇文章的理解，希望对你有帮助。"
+        if malformed == "placeholder":
+            return "标题: 【分类】中文标题\n摘要: 中文摘要"
+        if kind == "batch":
+            entries = []
+            for i, t in enumerate(titles, 1):
+                headline, category, summary = self._story(t, i)
+                entries.append({"id": i, "title": f"【{category}】{headline}", "summary": summary, "category": category})
+            text = json.dumps(entries, ensure_ascii=False)
+        elif kind == "title":
+            headline, category, _ = self._story(prompt)
+            text = f"标题: 【{category}】{headline}"
+        elif kind == "repair":
+            text = f"摘要: {self._story(prompt)[2]}"
+        else:
+            headline, category, summary = self._story(titles[0])
+            fmt = self.args.format if self.args.format != "auto" else kind
+            if fmt == "json":
+                text = json.dumps({"title": headline, "category": category, "summary": summary, "language": "zh"},
+                                  ensure_ascii=False)
+            else:
+                text = f"标题: 【{category}】{headline}\n摘要: {summary}"
+        if malformed == "missing_summary":
+            return text.split("\n")[0] if kind == "lines" else text.replace("summary", "abstract")
+        if malformed == "truncated":
+            return text[: max(1, len(text) // 2)]
+        if malformed == "runaway":
+            return text + "\n" + "补充说明：以下内容与任务无关，模型仍在继续输出。\n" * 60
+        return text
+
+
+def make_handler(mock: MockLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            if not mock.args.quiet:
+                sys.stderr.write("%s - %s\n" % (self.address_string(), fmt % args))
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, payload, text):
+            """Send text as OpenAI-style chat.completion.chunk events, then [DONE]."""
+            mock._count("streamed")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            base = {"id": f"mock-{mock.stats['requests']}", "object": "chat.completion.chunk",
+                    "created": int(time.time()), "model": payload.get("model") or "mock"}
+            step = max(1, mock.args.chunk_chars)
+            pieces = [text[i:i + step] for i in range(0, len(text), step)]
+            try:
+                for i, piece in enumerate(pieces):
+                    delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+                    event = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+                    self.wfile.write(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+                    self.wfile.flush()
+                    time.sleep(mock.args.chunk_ms / 1000.0)
+                event = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                self.wfile.write(b"data: " + json.dumps(event).encode("utf-8") + b"\n\ndata: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                mock._count("client_closed")
+
+        def do_GET(self):
+            if self.path.rstrip("/") in ("/stats", "/v1/stats"):
+                self._send_json(200, mock.stats)
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/chat/completions", "/v1/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                prompt = "\n".join(str(m.get("content") or "") for m in payload.get("messages", []))
+            except Exception as e:
+                self._send_json(400, {"error": {"message": f"bad request: {e}"}})
+                return
+            mock._count("requests")
+            latency, status, malformed = mock._draw()
+            time.sleep(latency)
+            if status == 429:
+                mock._count("429")
+                self._send_json(429, {"error": {"message": "rate limited (mock)", "type": "rate_limit_error"}},
+                                {"Retry-After": str(mock.args.retry_after)})
+                return
+            if status == 500:
+                mock._count("500")
+                self._send_json(500, {"error": {"message": "internal error (mock)"}})
+                return
+            kind = mock.prompt_kind(prompt)
+            text = mock.reply(prompt, kind, malformed)
+            mock._count("malformed" if malformed else "ok", kind)
+            if payload.get("stream"):
+                self._send_stream(payload, text)
+                return
+            completion_tokens = len(text.encode("utf-8")) // 3 + 1
+            max_tokens = int(payload.get("max_tokens") or 0)
+            self._send_json(200, {
+                "id": f"mock-{mock.stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model") or "mock",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "length" if max_tokens and completion_tokens >= max_tokens else "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": len(prompt.encode("utf-8")) // 3 + 1,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": len(prompt.encode("utf-8")) // 3 + 1 + completion_tokens,
+                },
+            })
+
+    return Handler
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server for offline benchmarking")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8808)
+    p.add_argument("--latency-ms", type=float, default=800.0, help="median (lognormal) / mean latency")
+    p.add_argument("--latency-dist", choices=("fixed", "uniform", "lognormal", "exponential"), default="lognormal")
+    p.add_argument("--sigma", type=float, default=0.5, help="lognormal shape")
+    p.add_argument("--jitter", type=float, default=0.3, help="uniform +/- fraction of --latency-ms")
+    p.add_argument("--tail-rate", type=float, default=0.0, help="fraction of requests given an extra --tail-ms")
+    p.add_argument("--tail-ms", type=float, default=10000.0)
+    p.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered 429")
+    p.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    p.add_argument("--rate-500", type=float, default=0.0, help="fraction of requests answered 500")
+    p.add_argument("--malformed-rate", type=float, default=0.0,
+                   help=f"fraction of 200 replies replaced by one of: {', '.join(MALFORMED_KINDS)}")
+    p.add_argument("--chunk-chars", type=int, default=8, help="characters per streamed chunk")
+    p.add_argument("--chunk-ms", type=float, default=20.0, help="delay between streamed chunks")
+    p.add_argument("--format", choices=("auto", "lines", "json"), default="auto",
+                   help="summary reply format; auto follows the prompt")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--quiet", action="store_true", help="do not log each request")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    mock = MockLLM(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(mock))
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1 "
+          f"(latency {args.latency_dist} {args.latency_ms:.0f}ms, 429 {args.rate_429:.0%}, "
+          f"500 {args.rate_500:.0%}, malformed {args.malformed_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(mock.stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()